@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import Depends, FastAPI, HTTPException, Request
@@ -5,6 +6,18 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import APIKeyHeader
 
 from app.routers import lyrics, youtube
+from app.services.browser_pool import BrowserPool
+from app.services.genius import Genius, make_genius_client, make_genius_page_client
+from app.services.host_limiter import HostLimiter
+from app.services.page_cache import PageCache
+from app.services.latency import LatencyTracker
+from app.services.lyrics_cache import LyricsCache
+from app.services.media_executor import MediaExecutor
+from app.services.musixmatch import Musixmatch
+from app.services.preview_cache import PreviewCache
+from app.services.preview_jobs import PreviewJobRunner, PreviewJobStore
+from app.services.source_cache import SourceAudioCache
+from app.services.youtube import make_youtube_client
 from app.utils.config import get_settings
 from app.utils.logger import logger, setup_logging_and_handlers
 
@@ -30,8 +43,157 @@ from app.utils.logger import logger, setup_logging_and_handlers
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    app.state.settings = get_settings()
-    yield
+    settings = get_settings()
+    app.state.settings = settings
+
+    # Chromium is launched once per worker and shared by every lyrics request
+    app.state.browser_pool = BrowserPool(
+        contexts=settings.browser_pool_contexts,
+        tabs=settings.browser_pool_tabs,
+    )
+    # The persistent Musixmatch profile can only be opened by one browser at a time,
+    # so it gets a single context that is launched on first use
+    app.state.musixmatch_pool = BrowserPool(
+        contexts=1,
+        tabs=settings.browser_pool_tabs,
+        browser_config=Musixmatch.browser_config(settings.musixmatch_profile_path),
+        name="musixmatch",
+    )
+    await app.state.browser_pool.start()
+
+    # Paces every upstream host across all workers on the machine; an empty
+    # HOST_LIMITS_PATH disables it
+    app.state.host_limiter = (
+        HostLimiter(
+            settings.host_limits_path,
+            acquire_timeout_sec=settings.host_limits_acquire_timeout_sec,
+        )
+        if settings.host_limits_path
+        else None
+    )
+
+    # Raw pages as fetched by every provider, for re-extraction without the
+    # network; an empty PAGE_CACHE_PATH disables it
+    app.state.page_cache = (
+        PageCache(
+            settings.page_cache_path,
+            mode=settings.page_cache_mode,
+            max_age_sec=settings.page_cache_max_age_sec,
+            max_bytes=settings.page_cache_max_bytes,
+        )
+        if settings.page_cache_path
+        else None
+    )
+
+    # Keep-alive pools for the Genius API and static lyric page fetches (Genius
+    # fast path); one provider instance is shared by every lyrics request
+    app.state.genius_client = make_genius_client(
+        settings.genius_client_access_token,
+        max_connections=settings.genius_http_max_connections,
+        max_keepalive_connections=settings.genius_http_max_keepalive,
+        retries=settings.genius_http_retries,
+        limiter=app.state.host_limiter,
+    )
+    app.state.genius_page_client = make_genius_page_client(
+        max_connections=settings.genius_http_max_connections,
+        max_keepalive_connections=settings.genius_http_max_keepalive,
+        limiter=app.state.host_limiter,
+    )
+    app.state.genius = (
+        Genius(
+            access_token=settings.genius_client_access_token,
+            client=app.state.genius_client,
+            page_client=app.state.genius_page_client,
+            crawler_pool=app.state.browser_pool,
+            page_cache=app.state.page_cache,
+            limiter=app.state.host_limiter,
+        )
+        if settings.genius_client_access_token
+        else None
+    )
+    # Shared by every YouTube search so concurrent searches reuse warm connections
+    app.state.youtube_client = make_youtube_client(
+        max_connections=settings.youtube_http_max_connections,
+        max_keepalive_connections=settings.youtube_http_max_keepalive,
+        limiter=app.state.host_limiter,
+    )
+    # yt-dlp downloads and ffmpeg cuts run here instead of on the event loop
+    app.state.media_executor = MediaExecutor(
+        max_workers=settings.media_max_workers,
+        max_queue=settings.media_max_queue,
+    )
+
+    # Per-provider lyric latencies order and time the `auto` source hedge
+    app.state.lyrics_latency = LatencyTracker(
+        default_sec=settings.lyrics_hedge_delay_sec,
+        min_sec=settings.lyrics_hedge_min_delay_sec,
+        max_sec=settings.lyrics_hedge_max_delay_sec,
+    )
+
+    # An empty LYRICS_CACHE_PATH disables the lyrics cache
+    app.state.lyrics_cache = (
+        LyricsCache(
+            settings.lyrics_cache_path,
+            ttl_sec=settings.lyrics_cache_ttl_sec,
+            negative_ttl_sec=settings.lyrics_cache_negative_ttl_sec,
+            max_entries=settings.lyrics_cache_max_entries,
+        )
+        if settings.lyrics_cache_path
+        else None
+    )
+    # An empty PREVIEW_CACHE_PATH disables the preview cache
+    app.state.preview_cache = (
+        PreviewCache(
+            settings.preview_cache_path,
+            max_bytes=settings.preview_cache_max_bytes,
+        )
+        if settings.preview_cache_path
+        else None
+    )
+    # Full downloads kept per video so later cuts skip yt-dlp entirely
+    app.state.source_cache = (
+        SourceAudioCache(
+            settings.source_cache_path,
+            max_bytes=settings.source_cache_max_bytes,
+        )
+        if settings.source_cache_path
+        else None
+    )
+    # Queued previews are claimed by whichever worker is free and kept on disk
+    # until fetched, so long album runs do not hold a request open
+    app.state.preview_jobs = PreviewJobStore(
+        settings.preview_jobs_path,
+        ttl_sec=settings.preview_jobs_ttl_sec,
+        max_pending=settings.preview_jobs_max_pending,
+    )
+    app.state.preview_job_runner = PreviewJobRunner(
+        app.state.preview_jobs,
+        lambda payload: youtube.run_preview_job(app, payload),
+        workers=settings.preview_job_workers,
+    )
+    app.state.preview_job_runner.start()
+
+    try:
+        yield
+    finally:
+        await app.state.preview_job_runner.close()
+        app.state.preview_jobs.close()
+        if app.state.lyrics_cache:
+            app.state.lyrics_cache.close()
+        if app.state.preview_cache:
+            app.state.preview_cache.close()
+        if app.state.source_cache:
+            app.state.source_cache.close()
+        await app.state.genius_client.aclose()
+        await app.state.genius_page_client.aclose()
+        await app.state.youtube_client.aclose()
+        app.state.media_executor.shutdown()
+        if app.state.host_limiter:
+            app.state.host_limiter.close()
+        if app.state.page_cache:
+            app.state.page_cache.close()
+        await app.state.musixmatch_pool.close()
+        await app.state.browser_pool.close()
 
 
 app = FastAPI(
@@ -60,6 +222,59 @@ async def root():
     return {"message": "Music API is running"}
 
 
+def breaker_stats() -> list:
+    return [
+        *(breaker.stats() for breaker in lyrics.lyrics_breakers.values()),
+        youtube.search_breaker.stats(),
+        youtube.media_breaker.stats(),
+    ]
+
+
+@app.get("/health/breakers")
+async def breakers():
+    """Per-provider circuit breaker state for this worker"""
+    return {"circuitBreakers": breaker_stats()}
+
+
 @app.get("/health")
-async def health():
-    return {"status": "healthy"}
+async def health(request: Request):
+    return {
+        "status": "healthy",
+        "browserPools": [
+            request.app.state.browser_pool.health(),
+            request.app.state.musixmatch_pool.health(),
+        ],
+        "singleFlight": [
+            lyrics.lyrics_flight.stats(),
+            youtube.search_flight.stats(),
+            youtube.preview_flight.stats(),
+            youtube.resolve_flight.stats(),
+            youtube.source_flight.stats(),
+        ],
+        "circuitBreakers": breaker_stats(),
+        "lyricsLatency": request.app.state.lyrics_latency.stats(),
+        "hostLimits": (
+            request.app.state.host_limiter.stats()
+            if request.app.state.host_limiter
+            else None
+        ),
+        "pageCache": (
+            request.app.state.page_cache.stats()
+            if request.app.state.page_cache
+            else None
+        ),
+        "mediaExecutor": request.app.state.media_executor.stats(),
+        "previewCache": (
+            request.app.state.preview_cache.stats()
+            if request.app.state.preview_cache
+            else None
+        ),
+        "previewJobs": await asyncio.to_thread(
+            request.app.state.preview_job_runner.stats
+        ),
+        "sourceCache": (
+            request.app.state.source_cache.stats()
+            if request.app.state.source_cache
+            else None
+        ),
+    }
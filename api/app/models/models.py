@@ -7,6 +7,7 @@ from pydantic import BaseModel, Field
 class LyricSource(str, Enum):
     genius = "genius"
     musixmatch = "musixmatch"
+    auto = "auto"
 
 class LyricRequest(BaseModel):
     source: LyricSource
@@ -20,6 +21,29 @@ class LyricResponse(BaseModel):
     lyrics: Optional[str]
     url: Optional[str]
 
+class LyricBatchTrack(BaseModel):
+    title: str = Field(..., description="Track title")
+    artist: str = Field(..., description="Artist name")
+    trackNumber: Optional[int] = Field(None, description="Position on the album")
+
+class LyricBatchRequest(BaseModel):
+    source: LyricSource
+    tracks: List[LyricBatchTrack] = Field(..., min_length=1, max_length=100)
+    album: Optional[str] = Field(None, description="Album name for album-wide lookup")
+    albumArtist: Optional[str] = Field(None, description="Album artist name")
+
+class LyricBatchItem(BaseModel):
+    title: str
+    artist: str
+    status: int
+    lyrics: Optional[str] = None
+    url: Optional[str] = None
+    error: Optional[str] = None
+
+class LyricBatchResponse(BaseModel):
+    source: LyricSource
+    items: List[LyricBatchItem]
+
 class AudioSource(str, Enum):
     youtube = "youtube"
 
@@ -34,13 +58,46 @@ class SearchResultItem(BaseModel):
     durationSec: int
     url: str
     category: str
+    score: Optional[float] = Field(None, description="Ranking score, higher is better")
 
 class SearchResponse(BaseModel):
     items: List[SearchResultItem]
 
+class SearchBatchRequest(BaseModel):
+    tracks: List[SearchRequest] = Field(..., min_length=1, max_length=100)
+    album: Optional[str] = Field(None, description="Album name for playlist lookup")
+    albumArtist: Optional[str] = Field(None, description="Album artist name")
+
+class SearchBatchItem(BaseModel):
+    index: int
+    title: str
+    artist: str
+    status: int
+    items: List[SearchResultItem] = Field(default_factory=list)
+    error: Optional[str] = None
+
 class PreviewRequest(BaseModel):
     trackId: str
     candidates: List[SearchResultItem]
     previewStartSec: float = 30.0
     previewLenSec: float = Field(60, ge=5, le=90)
     bitrateKbps: int = 160
+
+class PreviewJobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+class PreviewJob(BaseModel):
+    jobId: str
+    trackId: str
+    status: PreviewJobStatus
+    error: Optional[str] = None
+    resultUrl: Optional[str] = None
+
+class PreviewJobBatchRequest(BaseModel):
+    previews: List[PreviewRequest] = Field(..., min_length=1, max_length=100)
+
+class PreviewJobBatchResponse(BaseModel):
+    jobs: List[PreviewJob]
@@ -1,40 +1,131 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
 
-from app.models.models import LyricRequest, LyricResponse, LyricSource
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+
+from app.models.models import (
+    LyricBatchItem,
+    LyricBatchRequest,
+    LyricBatchResponse,
+    LyricBatchTrack,
+    LyricRequest,
+    LyricResponse,
+    LyricSource,
+)
 from app.services.genius import Genius
+from app.services.latency import LatencyTracker
+from app.services.lyrics_cache import LyricsCache
 from app.services.musixmatch import Musixmatch
+from app.utils.breaker import CircuitBreaker, CircuitOpenError, busy_headers
 from app.utils.config import get_settings
-from app.utils.logger import NoResultsError, ProviderError, logger
+from app.utils.hedge import hedged
+from app.utils.logger import BusyError, NoResultsError, ProviderError, logger
+from app.utils.singleflight import SingleFlight
+from app.utils.text import normalize_text
 
 router = APIRouter()
 
+# Identical lyric requests in flight at the same time share one search + crawl
+lyrics_flight = SingleFlight("lyrics")
+
+# A provider that keeps failing is refused for a while instead of costing a
+# full search + crawl per request
+lyrics_breakers = {
+    LyricSource.genius: CircuitBreaker("genius"),
+    # Broken Musixmatch markup shows up as empty search results, not errors
+    LyricSource.musixmatch: CircuitBreaker(
+        "musixmatch", min_calls=10, failure_rate=0.8, count_no_results=True
+    ),
+}
+
+# Providers raced by the `auto` source
+AUTO_SOURCES = (LyricSource.genius, LyricSource.musixmatch)
 
-def make_lyric_provider(source: LyricSource, settings):
+
+def make_lyric_provider(source: LyricSource, settings, state=None):
+    crawler_pool = getattr(state, "browser_pool", None)
     if source == LyricSource.genius:
-        return Genius(access_token=settings.genius_client_access_token)
+        # The app-lifetime instance only holds shared pools, so aclose() is a no-op
+        shared = getattr(state, "genius", None)
+        if shared is not None:
+            return shared
+        return Genius(
+            access_token=settings.genius_client_access_token,
+            crawler_pool=crawler_pool,
+            client=getattr(state, "genius_client", None),
+            page_client=getattr(state, "genius_page_client", None),
+            page_cache=getattr(state, "page_cache", None),
+            limiter=getattr(state, "host_limiter", None),
+        )
     if source == LyricSource.musixmatch:
-        return Musixmatch(musixmatch_profile_path=settings.musixmatch_profile_path)
+        return Musixmatch(
+            musixmatch_profile_path=settings.musixmatch_profile_path,
+            crawler_pool=crawler_pool,
+            profile_pool=getattr(state, "musixmatch_pool", None),
+            limiter=getattr(state, "host_limiter", None),
+            page_cache=getattr(state, "page_cache", None),
+        )
     raise HTTPException(status_code=400, detail="Unsupported provider")
 
 
-# TODO maybe try crawl4ai arun_many() for crawling multiple urls instead of one url per crawl
-@router.post("/lyrics/{source}", response_model=LyricResponse)
-async def get_lyrics(
-    req: LyricRequest,
-):
-    settings = get_settings()
-    client = make_lyric_provider(req.source, settings)
-    provider_name = req.source.value
+def lyrics_look_complete(lyrics: Optional[str]) -> bool:
+    """Quality gate for the `auto` race: a few lines of text, not a stub or notice"""
+    if not lyrics:
+        return False
+    lines = [
+        line
+        for line in lyrics.splitlines()
+        if line.strip() and not line.lstrip().startswith("[")
+    ]
+    return len(lines) >= 4 and sum(len(line) for line in lines) >= 80
+
+
+def lyrics_cache_key(
+    source: LyricSource, title: str, artist: str
+) -> Tuple[str, str, str]:
+    return (
+        source.value,
+        normalize_text(title),
+        normalize_text(artist),
+    )
+
+
+async def fetch_lyrics(
+    source: LyricSource,
+    title: str,
+    artist: str,
+    state,
+    cache: Optional[LyricsCache],
+) -> Tuple[str, str]:
+    """
+    Search, scrape and clean one track with a provider owned by this call, so a
+    coalesced fetch survives the request that started it
+    """
+    client = make_lyric_provider(source, get_settings(), state)
+    provider_name = source.value
+    cache_key = lyrics_cache_key(source, title, artist)
+    tracker: Optional[LatencyTracker] = getattr(state, "lyrics_latency", None)
+    breaker = lyrics_breakers[source]
+    started = time.monotonic()
+    # A crawl that errored (timeout, browser crash) is a 404 for this request
+    # only; just answers that really had no lyrics are cached as misses
+    cache_miss = True
 
     try:
-        url = await client.get_lyric_url(title=req.title, artist=req.artist)
+        async with breaker.guard():
+            url = await client.get_lyric_url(title=title, artist=artist)
 
         if not url:
             raise NoResultsError(
-                f"No {provider_name} URL found for '{req.title}' by '{req.artist}'"
+                f"No {provider_name} URL found for '{title}' by '{artist}'"
             )
 
-        lyrics_md, err = await client.scrape_lyrics(url)
+        async with breaker.guard() as call:
+            lyrics_md, err = await client.scrape_lyrics(url)
+            if lyrics_md is None and err:
+                call.fail()
+                cache_miss = False
         if lyrics_md is None:
             raise NoResultsError(
                 f"No lyrics found in {provider_name.capitalize()} URL: {url}"
@@ -42,6 +133,360 @@ async def get_lyrics(
             )
 
         cleaned_lyrics = client.clean_lyrics_markdown(lyrics_md)
+        if tracker:
+            tracker.record(provider_name, time.monotonic() - started)
+        if cache:
+            await asyncio.to_thread(
+                cache.put, *cache_key, lyrics=cleaned_lyrics, url=url
+            )
+        return cleaned_lyrics, url
+
+    except NoResultsError as e:
+        if tracker:
+            tracker.record_failure(provider_name)
+        if cache and cache_miss:
+            await asyncio.to_thread(cache.put_miss, *cache_key, error=str(e))
+        raise
+    except ProviderError:
+        if tracker:
+            tracker.record_failure(provider_name)
+        raise
+    finally:
+        try:
+            await client.aclose()
+        except Exception:
+            logger.exception("Error closing %s client", provider_name)
+
+
+async def race_lyrics(
+    title: str,
+    artist: str,
+    state,
+    cache: Optional[LyricsCache],
+    response: Response,
+    bypass: bool = False,
+) -> Tuple[LyricSource, str, str]:
+    """
+    `auto` source: hedge Genius against Musixmatch and keep the first good answer
+    - a cached hit from either source answers right away; sources with a cached
+      miss are skipped
+    - the provider with the lower median latency starts first, the other once
+      the first has taken longer than its p90 latency, or right away when the
+      first fails or returns lyrics that fail lyrics_look_complete
+    - when every source only has lyrics that look incomplete (a genuinely short
+      song), the last of them is served rather than a 404
+    - the loser is cancelled; its lyrics_flight task stops unless another
+      request is waiting on it
+    """
+    sources = list(AUTO_SOURCES)
+    if cache and not bypass:
+        misses = []
+        short_hits = []
+        for source in AUTO_SOURCES:
+            cached = await asyncio.to_thread(
+                cache.get, *lyrics_cache_key(source, title, artist)
+            )
+            if cached and cached.is_miss:
+                misses.append(cached)
+                sources.remove(source)
+            elif cached and lyrics_look_complete(cached.lyrics):
+                response.headers["X-Cache"] = "HIT"
+                return source, cached.lyrics, cached.url  # type: ignore[return-value]
+            elif cached and cached.lyrics:
+                short_hits.append((source, cached))
+        if not sources:
+            response.headers["X-Cache"] = "HIT"
+            raise NoResultsError(misses[-1].error or "No lyrics found")
+        if len(short_hits) == len(sources):
+            response.headers["X-Cache"] = "HIT"
+            source, cached = short_hits[-1]
+            return source, cached.lyrics, cached.url  # type: ignore[return-value]
+    response.headers["X-Cache"] = "BYPASS" if bypass else "MISS"
+
+    tracker: Optional[LatencyTracker] = getattr(state, "lyrics_latency", None)
+    if tracker:
+        sources = [LyricSource(n) for n in tracker.order([s.value for s in sources])]
+        delay = tracker.hedge_delay(sources[0].value)
+    else:
+        delay = get_settings().lyrics_hedge_delay_sec
+
+    # Non-empty answers that failed lyrics_look_complete, in arrival order
+    short: List[Tuple[LyricSource, str, str]] = []
+    # Start times of attempts still running, to censor the losers' latency
+    running: Dict[LyricSource, float] = {}
+
+    def attempt(source: LyricSource):
+        async def run() -> Tuple[LyricSource, str, str]:
+            running[source] = time.monotonic()
+            try:
+                lyrics, url = await lyrics_flight.do(
+                    lyrics_cache_key(source, title, artist),
+                    lambda: fetch_lyrics(source, title, artist, state, cache),
+                )
+            except Exception:
+                del running[source]
+                raise
+            del running[source]
+            if not lyrics_look_complete(lyrics):
+                if lyrics:
+                    short.append((source, lyrics, url))
+                raise NoResultsError(
+                    f"{source.value} lyrics for '{title}' by '{artist}' look incomplete"
+                )
+            return source, lyrics, url
+
+        return run
+
+    try:
+        idx, result = await hedged(
+            [attempt(source) for source in sources],
+            delay_sec=delay,
+            max_parallel=len(sources),
+        )
+    except (NoResultsError, ProviderError, BusyError):
+        if not short:
+            raise
+        logger.info(
+            "auto lyrics for %s - %s: serving short %s lyrics",
+            title,
+            artist,
+            short[-1][0].value,
+        )
+        return short[-1]
+
+    # Attempts still running lost the race (a client disconnect never gets
+    # here): they would have taken at least this long
+    if tracker:
+        now = time.monotonic()
+        for source, started in running.items():
+            tracker.record_censored(source.value, now - started)
+    logger.info(
+        "auto lyrics for %s - %s: %s won (attempt %d, hedge %.2fs)",
+        title,
+        artist,
+        result[0].value,
+        idx + 1,
+        delay,
+    )
+    return result
+
+
+# Registered before /lyrics/{source} so "batch" is not captured as a source
+@router.post("/lyrics/batch", response_model=LyricBatchResponse)
+async def get_lyrics_batch(
+    req: LyricBatchRequest,
+    request: Request,
+    x_cache_bypass: bool = Header(default=False),
+):
+    """
+    Resolve every track url (album-wide when `album` is given, otherwise one
+    search per track), then crawl all pages in one dispatch
+    """
+    settings = get_settings()
+    client = make_lyric_provider(req.source, settings, request.app.state)
+    provider_name = req.source.value
+    breaker = lyrics_breakers[req.source]
+    limit = asyncio.Semaphore(settings.lyrics_batch_concurrency)
+    cache: Optional[LyricsCache] = getattr(request.app.state, "lyrics_cache", None)
+    cache_hits = set()
+    # Items whose crawl errored: reported as 404 but not cached as misses
+    crawl_errors = set()
+
+    async def resolve(track: LyricBatchTrack, item: LyricBatchItem) -> None:
+        async with limit:
+            try:
+                async with breaker.guard():
+                    item.url = await client.get_lyric_url(
+                        title=track.title, artist=track.artist
+                    )
+                if not item.url:
+                    raise NoResultsError(
+                        f"No {provider_name} URL found for '{track.title}' by '{track.artist}'"
+                    )
+            except NoResultsError as e:
+                item.status, item.error = 404, str(e)
+            except BusyError as e:
+                item.status, item.error = 503, str(e)
+            except ProviderError as e:
+                item.status = 502
+                item.error = f"{provider_name} provider error: {str(e)}"
+            except Exception:
+                logger.exception(
+                    "Unexpected error (%s) resolving %s - %s",
+                    provider_name,
+                    track.title,
+                    track.artist,
+                )
+                item.status, item.error = 500, "Internal Server Error"
+
+    try:
+        items = []
+        uncached = []
+        for track in req.tracks:
+            item = LyricBatchItem(title=track.title, artist=track.artist, status=200)
+            items.append(item)
+
+            cached = None
+            if cache and not x_cache_bypass:
+                cached = await asyncio.to_thread(
+                    cache.get, *lyrics_cache_key(req.source, track.title, track.artist)
+                )
+            if cached:
+                item.lyrics, item.url, item.error = (
+                    cached.lyrics,
+                    cached.url,
+                    cached.error,
+                )
+                item.status = 404 if cached.is_miss else 200
+                cache_hits.add(id(item))
+            else:
+                uncached.append((track, item))
+
+        # One album lookup replaces most of the per-track searches
+        if req.album and uncached:
+            try:
+                async with breaker.guard():
+                    album_urls = await client.get_album_lyric_urls(
+                        album=req.album,
+                        artist=req.albumArtist or uncached[0][0].artist,
+                        tracks=[(t.title, t.trackNumber) for t, _ in uncached],
+                    )
+            except BusyError as e:
+                # Per-track resolves report their own 503s (fast while the
+                # breaker is open)
+                logger.warning("%s album lookup skipped: %s", provider_name, e)
+                album_urls = []
+            for (_, item), url in zip(uncached, album_urls):
+                item.url = url
+
+        await asyncio.gather(
+            *(resolve(track, item) for track, item in uncached if not item.url)
+        )
+
+        pending = [i for i in items if i.status == 200 and i.url and i.lyrics is None]
+        urls = list(dict.fromkeys(i.url for i in pending))
+        pages: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        if urls:
+            # The whole crawl is one breaker call: an open breaker skips the
+            # browser dispatch, and it fails when most of its pages errored
+            try:
+                async with breaker.guard() as call:
+                    pages = await client.scrape_urls(
+                        urls, max_concurrency=settings.lyrics_batch_concurrency
+                    )
+                    errored = sum(1 for md, err in pages.values() if md is None and err)
+                    if errored * 2 > len(pages):
+                        call.fail()
+            except CircuitOpenError as e:
+                for item in pending:
+                    item.status, item.error = 503, str(e)
+                pending = []
+
+        for item in pending:
+            if item.url not in pages:
+                # Turned away by the host limiter (see scrape_urls)
+                item.status = 503
+                item.error = (
+                    f"Upstream {provider_name} is rate limited, try again later"
+                )
+                continue
+            lyrics_md, err = pages[item.url]  # type: ignore
+            if lyrics_md is None and err:
+                crawl_errors.add(id(item))
+            if lyrics_md is None:
+                item.status = 404
+                item.error = (
+                    f"No lyrics found in {provider_name.capitalize()} URL: {item.url}"
+                    + (f" Error: {err}" if err else "")
+                )
+            else:
+                item.lyrics = client.clean_lyrics_markdown(lyrics_md)
+
+        if cache:
+
+            def store() -> None:
+                for item in items:
+                    if id(item) in cache_hits or id(item) in crawl_errors:
+                        continue
+                    key = lyrics_cache_key(req.source, item.title, item.artist)
+                    if item.status == 200 and item.lyrics is not None:
+                        cache.put(*key, lyrics=item.lyrics, url=item.url)
+                    elif item.status == 404 and item.error:
+                        cache.put_miss(*key, error=item.error)
+
+            await asyncio.to_thread(store)
+
+        logger.info(
+            "%s batch: %d/%d tracks with lyrics",
+            provider_name,
+            sum(1 for i in items if i.status == 200),
+            len(items),
+        )
+        return LyricBatchResponse(source=req.source, items=items)
+
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Unexpected error (%s) in lyrics batch", provider_name)
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+    finally:
+        try:
+            await client.aclose()
+        except Exception:
+            logger.exception("Error closing %s client", provider_name)
+
+
+@router.post("/lyrics/{source}", response_model=LyricResponse)
+async def get_lyrics(
+    req: LyricRequest,
+    request: Request,
+    response: Response,
+    x_cache_bypass: bool = Header(default=False),
+):
+    provider_name = req.source.value
+    cache: Optional[LyricsCache] = getattr(request.app.state, "lyrics_cache", None)
+    cache_key = lyrics_cache_key(req.source, req.title, req.artist)
+
+    try:
+        if req.source == LyricSource.auto:
+            source, cleaned_lyrics, url = await race_lyrics(
+                req.title,
+                req.artist,
+                request.app.state,
+                cache,
+                response,
+                bypass=x_cache_bypass,
+            )
+            return LyricResponse(
+                source=source,
+                title=req.title,
+                artist=req.artist,
+                lyrics=cleaned_lyrics,
+                url=url,
+            )
+
+        if cache and not x_cache_bypass:
+            cached = await asyncio.to_thread(cache.get, *cache_key)
+            if cached:
+                response.headers["X-Cache"] = "HIT"
+            if cached and cached.is_miss:
+                raise NoResultsError(cached.error or "No lyrics found")
+            if cached:
+                return LyricResponse(
+                    source=req.source,
+                    title=req.title,
+                    artist=req.artist,
+                    lyrics=cached.lyrics,
+                    url=cached.url,
+                )
+        response.headers["X-Cache"] = "BYPASS" if x_cache_bypass else "MISS"
+
+        cleaned_lyrics, url = await lyrics_flight.do(
+            cache_key,
+            lambda: fetch_lyrics(
+                req.source, req.title, req.artist, request.app.state, cache
+            ),
+        )
 
         return LyricResponse(
             source=req.source,
@@ -59,7 +504,15 @@ async def get_lyrics(
             req.artist,
             str(e),
         )
-        raise HTTPException(status_code=404, detail=str(e))
+        # Cached misses still say where the answer came from
+        cache_header = response.headers.get("X-Cache")
+        raise HTTPException(
+            status_code=404,
+            detail=str(e),
+            headers={"X-Cache": cache_header} if cache_header else None,
+        )
+    except BusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers=busy_headers(e))
     except ProviderError as e:
         logger.error(
             "%s provider error for %s - %s",
@@ -78,8 +531,3 @@ async def get_lyrics(
             "Unexpected error (%s) for %s - %s", provider_name, req.title, req.artist
         )
         raise HTTPException(status_code=500, detail="Internal Server Error")
-    finally:
-        try:
-            await client.aclose()
-        except Exception:
-            logger.exception("Error closing %s client", provider_name)
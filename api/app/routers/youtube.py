@@ -1,21 +1,53 @@
+import asyncio
 import io
 import os
 import shutil
 import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from contextlib import AsyncExitStack, asynccontextmanager, nullcontext
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
-from yt_dlp import YoutubeDL
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
 
 from app.models.models import (
+    PreviewJob,
+    PreviewJobBatchRequest,
+    PreviewJobBatchResponse,
     PreviewRequest,
+    SearchBatchItem,
+    SearchBatchRequest,
     SearchRequest,
     SearchResponse,
     SearchResultItem,
 )
-from app.services.youtube import YoutubeScraper
+from app.services.host_limiter import THROTTLE_PATTERN
+from app.services.media_executor import MediaExecutor
+from app.services.preview_cache import (
+    CachedPreview,
+    PreviewCache,
+    PreviewWriter,
+    preview_key,
+)
+from app.services.preview_jobs import JobRecord, PreviewJobStore
+from app.services.source_cache import CachedSource, SourceAudioCache
+from app.services.youtube import YoutubeScraper, can_stream_copy, video_unavailable
+from app.utils.breaker import CircuitBreaker, busy_headers
 from app.utils.config import get_settings
-from app.utils.logger import NoResultsError, ProviderError, logger
+from app.utils.hedge import hedged
+from app.utils.logger import BusyError, NoResultsError, ProviderError, logger
+from app.utils.singleflight import SingleFlight
 
 # load_dotenv()
 
@@ -28,18 +60,138 @@ from app.utils.logger import NoResultsError, ProviderError, logger
 
 router = APIRouter()
 
+# The UI and the workflows often ask for the same track at the same moment
+search_flight = SingleFlight("youtube-search")
+preview_flight = SingleFlight("youtube-preview")
+resolve_flight = SingleFlight("youtube-resolve")
+source_flight = SingleFlight("youtube-source")
+
+# Fail fast while YouTube keeps failing searches or media fetches (challenges,
+# yt-dlp breakage) instead of paying for a full run per request; a private or
+# removed candidate is an answer about that video, not a media failure
+search_breaker = CircuitBreaker("youtube-search")
+media_breaker = CircuitBreaker("youtube-media", answered=video_unavailable)
+
+# Strong refs to fire-and-forget source prefetches
+_background: set = set()
+# Videos previewed recently in this worker; only a repeat is worth a full download
+_previewed: "OrderedDict[str, None]" = OrderedDict()
+PREVIEWED_MAX = 4096
+
+STREAM_CHUNK = 64 * 1024
+
+
+class _PreviewStream:
+    """
+    One streaming preview shared by every identical request.
+    - a pump task reads ffmpeg into memory as it goes (a preview is a few hundred
+      KB), so a request that joins late still gets the file from its first byte
+    - each reader follows the chunks as they arrive
+    - ffmpeg is killed once every reader has left before it finished
+    """
+
+    def __init__(self, headers: Dict[str, str]):
+        self.headers = headers
+        self.chunks: List[bytes] = []
+        self.done = False
+        self.abandoned = False
+        self.readers = 0
+        self.pump: Optional[asyncio.Future] = None
+        self._arrived = asyncio.Event()
+
+    def push(self, chunk: bytes) -> None:
+        self.chunks.append(chunk)
+        self._wake()
+
+    def finish(self) -> None:
+        self.done = True
+        self._wake()
+
+    def _wake(self) -> None:
+        arrived, self._arrived = self._arrived, asyncio.Event()
+        arrived.set()
+
+    async def read(self) -> AsyncIterator[bytes]:
+        self.readers += 1
+        try:
+            sent = 0
+            while True:
+                while sent < len(self.chunks):
+                    sent += 1
+                    yield self.chunks[sent - 1]
+                if self.done:
+                    return
+                await self._arrived.wait()
+        finally:
+            self.readers -= 1
+            if self.readers == 0 and not self.done and self.pump:
+                self.abandoned = True
+                self.pump.cancel()
+
+
+# Streaming previews still being produced, by preview key; later identical
+# requests read along instead of starting another ffmpeg
+_live_streams: Dict[Hashable, _PreviewStream] = {}
+
+
+T = TypeVar("T")
+
+
+def _scraper(app) -> YoutubeScraper:
+    settings = get_settings()
+    return YoutubeScraper(
+        client=app.state.youtube_client,
+        search_backend=settings.youtube_search_backend,
+        innertube_client_version=settings.youtube_innertube_client_version,
+        innertube_pages=settings.youtube_innertube_pages,
+        limiter=app.state.host_limiter,
+        page_cache=app.state.page_cache,
+    )
+
+
+@asynccontextmanager
+async def _media(scraper: YoutubeScraper, host: str = "googlevideo"):
+    """Breaker + limiter slot around one yt-dlp or ffmpeg fetch from YouTube"""
+    async with media_breaker.guard(), scraper.upstream(host):
+        yield
+
+
+def _norm(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+async def _cancel_on_disconnect(request: Request, work: Awaitable[T]) -> T:
+    """Cancel `work` if the client goes away before it finishes"""
+    task = asyncio.ensure_future(work)
+
+    async def watch():
+        while not task.done():
+            if await request.is_disconnected():
+                task.cancel()
+                return
+            await asyncio.sleep(0.5)
+
+    watcher = asyncio.ensure_future(watch())
+    try:
+        return await task
+    except asyncio.CancelledError:
+        if watcher.done():
+            raise HTTPException(status_code=499, detail="Client disconnected")
+        raise
+    finally:
+        watcher.cancel()
+
 
 @router.post("/youtube/search-scrape", response_model=SearchResponse)
 async def youtube_search_scrape(
     req: SearchRequest,
+    request: Request,
 ):
     """Search YouTube using manual scraping (no API limits)"""
-    scraper = YoutubeScraper()
+    scraper = _scraper(request.app)
 
     try:
-        candidates = await scraper.search_scrape(
-            title=req.title, artist=req.artist, duration_sec=req.durationSec
-        )
+        candidates = await _search_one(scraper, req)
 
         items = [SearchResultItem(**c) for c in candidates]
         return SearchResponse(items=items)
@@ -52,6 +204,8 @@ async def youtube_search_scrape(
             str(e),
         )
         raise HTTPException(status_code=404, detail=str(e))
+    except BusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers=busy_headers(e))
     except ProviderError as e:
         logger.error(
             "Youtube scraping provider error for %s - %s",
@@ -71,99 +225,786 @@ async def youtube_search_scrape(
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
+@router.post("/youtube/search-scrape/batch")
+async def youtube_search_scrape_batch(req: SearchBatchRequest, request: Request):
+    """
+    Search every track of an album over the shared client.
+    - with `album` set, the album's Topic playlist is resolved first and only the
+      tracks it cannot place are searched one by one
+    - at most `youtube_search_batch_concurrency` searches run at once
+    - the response is NDJSON: one SearchBatchItem per line, in completion order
+      (`index` points back into `tracks`)
+    """
+    scraper = _scraper(request.app)
+    limit = asyncio.Semaphore(get_settings().youtube_search_batch_concurrency)
+
+    async def search(index: int, track: SearchRequest) -> SearchBatchItem:
+        item = SearchBatchItem(
+            index=index, title=track.title, artist=track.artist, status=200
+        )
+        async with limit:
+            try:
+                candidates = await _search_one(scraper, track)
+                item.items = [SearchResultItem(**c) for c in candidates]
+            except NoResultsError as e:
+                item.status, item.error = 404, str(e)
+            except BusyError as e:
+                item.status, item.error = 503, str(e)
+            except ProviderError as e:
+                item.status = 502
+                item.error = f"Youtube scraping provider error: {str(e)}"
+            except Exception:
+                logger.exception(
+                    "Unexpected error (Youtube scraping) for %s - %s",
+                    track.title,
+                    track.artist,
+                )
+                item.status, item.error = 500, "Internal Server Error"
+        return item
+
+    async def lines() -> AsyncIterator[bytes]:
+        matches = await _resolve_album(scraper, req)
+        found = 0
+        for i, (track, match) in enumerate(zip(req.tracks, matches)):
+            if match:
+                found += 1
+                item = SearchBatchItem(
+                    index=i,
+                    title=track.title,
+                    artist=track.artist,
+                    status=200,
+                    items=[SearchResultItem(**match)],
+                )
+                yield item.model_dump_json().encode() + b"\n"
+
+        tasks = [
+            asyncio.ensure_future(search(i, t))
+            for i, (t, match) in enumerate(zip(req.tracks, matches))
+            if not match
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                found += item.status == 200
+                yield item.model_dump_json().encode() + b"\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+        logger.info(
+            "Youtube batch search: %d/%d tracks matched", found, len(req.tracks)
+        )
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+async def _resolve_album(scraper: YoutubeScraper, req: SearchBatchRequest) -> list:
+    if not req.album:
+        return [None] * len(req.tracks)
+    try:
+        matches = await scraper.resolve_album(
+            album=req.album,
+            artist=req.albumArtist or req.tracks[0].artist,
+            tracks=[(t.title, t.durationSec) for t in req.tracks],
+        )
+    except Exception:
+        logger.warning(
+            "Album playlist lookup failed for %s, searching per track",
+            req.album,
+            exc_info=True,
+        )
+        return [None] * len(req.tracks)
+
+    logger.info(
+        "Album playlist for %s placed %d/%d tracks",
+        req.album,
+        sum(1 for m in matches if m),
+        len(req.tracks),
+    )
+    return matches
+
+
+async def _search_one(scraper: YoutubeScraper, req: SearchRequest):
+    settings = get_settings()
+    key = (_norm(req.title), _norm(req.artist), req.durationSec)
+
+    # Guarded inside the flight so a coalesced search counts once
+    async def search():
+        async with search_breaker.guard():
+            if settings.youtube_search_fanout:
+                return await scraper.search_match(
+                    title=req.title,
+                    artist=req.artist,
+                    duration_sec=req.durationSec,
+                    enough=settings.youtube_search_fanout_enough,
+                    hedge_delay=settings.youtube_search_fanout_hedge_sec,
+                )
+            return await scraper.search_scrape(
+                title=req.title, artist=req.artist, duration_sec=req.durationSec
+            )
+
+    return await search_flight.do(key, search)
+
+
 @router.post("/youtube/preview-scrape")
 async def youtube_preview_scrape(
     req: PreviewRequest,
+    request: Request,
+    x_cache_bypass: bool = Header(default=False),
 ):
     """Generate preview using scraping-based search and yt-dlp download"""
     if not req.candidates:
         raise HTTPException(status_code=400, detail="candidateUrls required")
 
-    scraper = YoutubeScraper()
+    cache: Optional[PreviewCache] = request.app.state.preview_cache
+    if cache and not x_cache_bypass:
+        entry = await asyncio.to_thread(cache.get, _first_candidate_key(req))
+        if entry:
+            return _cached_preview_response(request, entry, "HIT")
+
+    scraper = _scraper(request.app)
+    executor: MediaExecutor = request.app.state.media_executor
+    sources: Optional[SourceAudioCache] = request.app.state.source_cache
+    key = (
+        tuple(c.url for c in req.candidates),
+        req.previewStartSec,
+        req.previewLenSec,
+        req.bitrateKbps,
+    )
+
+    if get_settings().preview_streaming:
+        stream = _live_streams.get(key)
+        if stream is None or stream.abandoned:
+            try:
+                stream = await _cancel_on_disconnect(
+                    request,
+                    preview_flight.do(
+                        key,
+                        lambda: _stream_preview(
+                            req, key, scraper, executor, cache, sources
+                        ),
+                    ),
+                )
+            except BusyError as e:
+                logger.warning("Preview rejected for %s: %s", req.trackId, str(e))
+                raise HTTPException(
+                    status_code=503, detail=str(e), headers=busy_headers(e)
+                )
+        return StreamingResponse(
+            stream.read(), media_type="audio/mp4", headers=dict(stream.headers)
+        )
+
+    async def job() -> Tuple[bytes, Dict[str, str]]:
+        async with executor.slot():
+            return await _generate_preview(req, scraper, executor, cache, sources)
+
+    try:
+        data, headers = await _cancel_on_disconnect(
+            request, preview_flight.do(key, job)
+        )
+    except BusyError as e:
+        logger.warning("Preview rejected for %s: %s", req.trackId, str(e))
+        raise HTTPException(status_code=503, detail=str(e), headers=busy_headers(e))
+
+    headers["X-Cache"] = "BYPASS" if x_cache_bypass else "MISS"
+    return StreamingResponse(io.BytesIO(data), media_type="audio/mp4", headers=headers)
+
+
+@router.get("/youtube/previews/{digest}")
+async def youtube_cached_preview(digest: str, request: Request):
+    """Serve a cached preview by content digest (supports Range and If-None-Match)"""
+    cache: Optional[PreviewCache] = request.app.state.preview_cache
+    entry = await asyncio.to_thread(cache.get_blob, digest) if cache else None
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Preview not cached")
+    return _cached_preview_response(request, entry, "HIT")
+
+
+@router.post("/youtube/preview-jobs", status_code=202, response_model=PreviewJob)
+async def youtube_preview_job_submit(req: PreviewRequest, request: Request):
+    """Queue a preview and return its job id right away"""
+    if not req.candidates:
+        raise HTTPException(status_code=400, detail="candidateUrls required")
+    return (await _submit_preview_jobs(request, [req]))[0]
+
+
+@router.post(
+    "/youtube/preview-jobs/batch",
+    status_code=202,
+    response_model=PreviewJobBatchResponse,
+)
+async def youtube_preview_job_submit_batch(
+    req: PreviewJobBatchRequest, request: Request
+):
+    """Queue many previews (e.g. a whole album) and return their job ids"""
+    if any(not p.candidates for p in req.previews):
+        raise HTTPException(status_code=400, detail="candidateUrls required")
+    return PreviewJobBatchResponse(
+        jobs=await _submit_preview_jobs(request, req.previews)
+    )
+
+
+@router.get("/youtube/preview-jobs/{job_id}", response_model=PreviewJob)
+async def youtube_preview_job_status(job_id: str, request: Request):
+    store: PreviewJobStore = request.app.state.preview_jobs
+    job = await asyncio.to_thread(store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return _preview_job(job)
+
+
+@router.get("/youtube/preview-jobs/{job_id}/result")
+async def youtube_preview_job_result(job_id: str, request: Request):
+    """Download a finished preview; it stays available briefly after the first read"""
+    store: PreviewJobStore = request.app.state.preview_jobs
+    job = await asyncio.to_thread(store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    if job.status == "failed":
+        raise HTTPException(status_code=502, detail=job.error or "Preview failed")
+    if job.status != "done" or not job.result_path:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+
+    await asyncio.to_thread(store.mark_fetched, job_id)
+    return FileResponse(job.result_path, media_type="audio/mp4", headers=job.headers)
+
+
+async def run_preview_job(app, payload: str) -> Tuple[bytes, Dict[str, str]]:
+    """PreviewJobRunner callback: produce one queued preview"""
+    req = PreviewRequest.model_validate_json(payload)
+    cache: Optional[PreviewCache] = app.state.preview_cache
+    entry = (
+        await asyncio.to_thread(cache.get, _first_candidate_key(req)) if cache else None
+    )
+    if entry:
+        data = await asyncio.to_thread(Path(entry.path).read_bytes)
+        headers = _preview_headers(req, entry.source_url, entry.bitrate_kbps)
+        headers["X-Cache"] = "HIT"
+        return data, headers
+
+    scraper = _scraper(app)
+    executor: MediaExecutor = app.state.media_executor
+    async with executor.slot():
+        data, headers = await _generate_preview(
+            req, scraper, executor, cache, app.state.source_cache
+        )
+    headers["X-Cache"] = "MISS"
+    return data, headers
+
+
+async def _submit_preview_jobs(request: Request, previews) -> list:
+    store: PreviewJobStore = request.app.state.preview_jobs
+    jobs = []
+    try:
+        for preview in previews:
+            job = await asyncio.to_thread(
+                store.submit, preview.trackId, preview.model_dump_json()
+            )
+            jobs.append(_preview_job(job))
+    except BusyError as e:
+        logger.warning("Preview job rejected: %s", str(e))
+        raise HTTPException(status_code=503, detail=str(e), headers=busy_headers(e))
+    finally:
+        request.app.state.preview_job_runner.notify()
+    return jobs
+
+
+def _preview_job(job: JobRecord) -> PreviewJob:
+    return PreviewJob(
+        jobId=job.id,
+        trackId=job.track_id,
+        status=job.status,
+        error=job.error,
+        resultUrl=(
+            f"/api/youtube/preview-jobs/{job.id}/result"
+            if job.status == "done"
+            else None
+        ),
+    )
+
+
+def _preview_cache_key(req: PreviewRequest, item) -> str:
+    return preview_key(
+        item.videoId, _preview_start(req, item), req.previewLenSec, req.bitrateKbps
+    )
+
+
+def _first_candidate_key(req: PreviewRequest) -> str:
+    """
+    Cache key of the candidate a fresh run would try first. A cached preview of
+    a lower-ranked candidate is not served in its place.
+    """
+    return _preview_cache_key(req, req.candidates[0])
+
+
+def _cached_preview_response(
+    request: Request, entry: CachedPreview, cache_status: str
+) -> Response:
+    headers = {
+        "ETag": entry.etag,
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Content-Location": f"/api/youtube/previews/{entry.digest}",
+        "X-Preview-Duration": str(entry.duration_sec),
+        "X-Codec": "aac",
+        "X-Bitrate-Kbps": str(entry.bitrate_kbps),
+        "X-Source-Url": entry.source_url,
+        "X-Method": "scraping",
+        "X-Cache": cache_status,
+    }
+
+    if_none_match = request.headers.get("if-none-match", "")
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    if "*" in tags or entry.etag in tags:
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(entry.path, media_type="audio/mp4", headers=headers)
+
+
+def _preview_start(req: PreviewRequest, item) -> float:
+    if getattr(item, "durationSec", 0) > 0 and item.durationSec <= 60:
+        return 0.0
+    return float(req.previewStartSec)
+
+
+def _preview_headers(
+    req: PreviewRequest, source_url: str, bitrate_kbps: Optional[int] = None
+) -> Dict[str, str]:
+    return {
+        "Content-Type": "audio/mp4",
+        "X-Preview-Duration": str(req.previewLenSec),
+        "X-Codec": "aac",
+        "X-Bitrate-Kbps": str(bitrate_kbps or req.bitrateKbps),
+        "X-Source-Url": source_url,
+        "X-Method": "scraping",
+    }
+
+
+async def _stream_preview(
+    req: PreviewRequest,
+    key: Hashable,
+    scraper: YoutubeScraper,
+    executor: MediaExecutor,
+    cache: Optional[PreviewCache] = None,
+    sources: Optional[SourceAudioCache] = None,
+) -> _PreviewStream:
+    """
+    Pipe the remote audio through ffmpeg straight into the response.
+    - yt-dlp only resolves the stream url; ffmpeg reads the previewed window with
+      ranged requests and emits fragmented MP4, so nothing touches the disk
+    - a candidate counts as working once ffmpeg has produced its first chunk;
+      later failures just end the stream early
+    - candidates are hedged: a slow one gets a backup started behind it
+    - the media slot is held until ffmpeg finishes or every reader has left
+    - the bytes are teed into the preview cache and kept only if ffmpeg finishes
+    - a video already in the source cache is cut from the local file instead
+    - X-Downloaded-Bytes is the previewed window at the source bitrate, which is
+      what ffmpeg's ranged reads fetch (0 for a local source); X-Bitrate-Kbps is
+      the source bitrate when the audio was stream-copied
+    """
+    settings = get_settings()
+    stack = AsyncExitStack()
+    await stack.enter_async_context(executor.slot())
+
+    def attempt(item):
+        return lambda: _open_stream(req, item, scraper, executor, sources)
+
+    try:
+        idx, (proc, stderr, first, local, served) = await hedged(
+            [attempt(item) for item in req.candidates],
+            delay_sec=settings.preview_hedge_delay_sec,
+            max_parallel=settings.preview_hedge_max_parallel,
+            discard=lambda opened: _kill(opened[0]),
+        )
+    except BaseException as e:
+        await stack.aclose()
+        if not isinstance(e, Exception) or isinstance(e, BusyError):
+            raise
+        raise HTTPException(status_code=502, detail=f"All candidates failed: {e}")
+
+    item = req.candidates[idx]
+    logger.info(
+        "Preview %s: streaming from %s (%s)",
+        req.trackId,
+        item.url,
+        "local source" if local else "remote",
+    )
+    if sources and not local:
+        _prefetch_source(item, scraper, executor, sources)
+    headers = _preview_headers(req, item.url, served["bitrate_kbps"])
+    headers["X-Cache"] = "MISS"
+    headers["X-Downloaded-Bytes"] = str(served["downloaded_bytes"])
+    headers["X-Source-Cache"] = "HIT" if local else "MISS"
+    on_done = None
+    if cache:
+        on_done = _cache_commit(
+            await asyncio.to_thread(cache.writer), req, item, served["bitrate_kbps"]
+        )
+
+    stream = _PreviewStream(headers)
+    stream.pump = asyncio.ensure_future(
+        _pump(key, stream, proc, stderr, first, stack, on_done)
+    )
+    _live_streams[key] = stream
+    return stream
+
+
+async def _open_stream(
+    req: PreviewRequest,
+    item,
+    scraper: YoutubeScraper,
+    executor: MediaExecutor,
+    sources: Optional[SourceAudioCache],
+) -> Tuple[
+    asyncio.subprocess.Process,
+    "asyncio.Task[bytes]",
+    bytes,
+    Optional[CachedSource],
+    Dict[str, int],
+]:
+    """
+    Start ffmpeg for one candidate and wait for its first chunk of audio.
+    - also returns what is being served: its bitrate and the bytes fetched for it
+    """
+    settings = get_settings()
+    local = await asyncio.to_thread(sources.get, item.videoId) if sources else None
+    if local:
+        src = {
+            "url": local.path,
+            "headers": {},
+            "acodec": local.acodec,
+            "abr": local.abr,
+        }
+    else:
+
+        async def resolve() -> Dict[str, Any]:
+            async with _media(scraper, "www.youtube.com"):
+                return await executor.run(
+                    lambda cancel: scraper.resolve_audio(
+                        item.url, settings.youtube_cookies_path
+                    )
+                )
+
+        src = await resolve_flight.do(item.url, resolve)
+
+    # The media host slot covers opening the stream; the rest of the body is
+    # read at the previewed bitrate and is not paced
+    async with nullcontext() if local else _media(scraper):
+        proc, stderr = await scraper.stream_m4a(
+            src["url"],
+            src["headers"],
+            start=_preview_start(req, item),
+            dur=req.previewLenSec,
+            bitrate_kbps=req.bitrateKbps,
+            copy=can_stream_copy(src["acodec"], src["abr"], req.bitrateKbps),
+        )
+        try:
+            assert proc.stdout is not None
+            first = await proc.stdout.read(STREAM_CHUNK)
+            if not first:
+                await proc.wait()
+                raise ProviderError(
+                    f"ffmpeg exited with {proc.returncode}: "
+                    f"{(await stderr).decode(errors='replace')[-500:]}"
+                )
+        except BaseException:
+            await _kill(proc)
+            raise
+
+    abr = None if local else src.get("abr") or req.bitrateKbps
+    served = {
+        "bitrate_kbps": _served_kbps(req, src["acodec"], src["abr"]),
+        "downloaded_bytes": int(abr * 125 * req.previewLenSec) if abr else 0,
+    }
+    return proc, stderr, first, local, served
+
+
+def _served_kbps(req: PreviewRequest, acodec: Optional[str], abr) -> int:
+    """Bitrate of the preview as served: stream-copied audio keeps the source's"""
+    if can_stream_copy(acodec, abr, req.bitrateKbps):
+        return round(abr)
+    return req.bitrateKbps
+
+
+async def _kill(proc: asyncio.subprocess.Process) -> None:
+    if proc.returncode is None:
+        proc.kill()
+    await proc.wait()
+
+
+def _prefetch_source(
+    item, scraper: YoutubeScraper, executor: MediaExecutor, sources: SourceAudioCache
+) -> None:
+    """
+    Download the full track in the background so the next cut of it is local.
+    - opt-in (source_cache_prefetch), and only once a video is previewed a
+      second time: a full download costs more than the ranged reads it saves
+      on a video that is only previewed once
+    """
     settings = get_settings()
+    if not settings.source_cache_prefetch:
+        return
+    repeat = item.videoId in _previewed
+    _previewed[item.videoId] = None
+    _previewed.move_to_end(item.videoId)
+    while len(_previewed) > PREVIEWED_MAX:
+        _previewed.popitem(last=False)
+    if not repeat or not executor.has_capacity():
+        return
+
+    async def fetch() -> Optional[CachedSource]:
+        async with executor.slot():
+            return await _download_source(item, scraper, executor, sources)
+
+    async def run():
+        try:
+            await source_flight.do(item.videoId, fetch)
+        except Exception:
+            logger.warning("Source prefetch failed for %s", item.url, exc_info=True)
+
+    task = asyncio.ensure_future(run())
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def _download_source(
+    item, scraper: YoutubeScraper, executor: MediaExecutor, sources: SourceAudioCache
+) -> Optional[CachedSource]:
+    settings = get_settings()
+    tmp = tempfile.mkdtemp(dir=sources.tmp_dir)
+    try:
+        async with _media(scraper):
+            path, downloaded_bytes, fmt = await executor.run(
+                lambda cancel: scraper.download_audio(
+                    item.url, tmp, settings.youtube_cookies_path, cancel_event=cancel
+                )
+            )
+        logger.info("Source %s: cached %d bytes", item.url, downloaded_bytes)
+        return await asyncio.to_thread(sources.put, item.videoId, path, fmt)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
 
-    last_err = None
+def _cache_commit(writer: PreviewWriter, req: PreviewRequest, item, bitrate_kbps: int):
+    """
+    Chunk sink for _pump that files the finished preview under its cache key
+    - file writes, the commit and its eviction run in a thread
+    """
 
-    for item in req.candidates:
+    async def sink(chunk: Optional[bytes], ok: bool = False) -> None:
+        if chunk is not None:
+            await asyncio.to_thread(writer.write, chunk)
+        elif ok:
+            await asyncio.to_thread(
+                writer.commit,
+                _preview_cache_key(req, item),
+                item.url,
+                bitrate_kbps,
+                req.previewLenSec,
+            )
+        else:
+            await asyncio.to_thread(writer.discard)
+
+    return sink
+
+
+async def _pump(
+    key: Hashable,
+    stream: _PreviewStream,
+    proc: asyncio.subprocess.Process,
+    stderr: "asyncio.Task[bytes]",
+    first: bytes,
+    stack: AsyncExitStack,
+    sink=None,
+) -> None:
+    """Read ffmpeg into `stream` until it exits; cancelled when every reader left"""
+    finished = False
+    try:
+        chunk = first
+        while chunk:
+            if sink:
+                await sink(chunk)
+            stream.push(chunk)
+            assert proc.stdout is not None
+            chunk = await proc.stdout.read(STREAM_CHUNK)
+        finished = True
+    finally:
         try:
-            with tempfile.TemporaryDirectory() as tmp:
-                # TODO abstract the download of the video url into the YoutubeScraper class
-                out_tmpl = os.path.join(tmp, "%(id)s.%(ext)s")
-                ydl_opts = {
-                    "outtmpl": {"default": out_tmpl},
-                    "format": "bestaudio[ext=m4a]/bestaudio[ext=mp4]/bestaudio/best[height<=480]/best",
-                    "noplaylist": True,
-                    # "quiet": True,
-                    "verbose": True,
-                    "no_warnings": True,
-                    "socket_timeout": 15,
-                    "retries": 3,
-                    "concurrent_fragment_downloads": 4,
-                    "extract_flat": False,
-                    "ignoreerrors": False,
-                    "cookiefile": settings.youtube_cookies_path,
-                    "extractor_args": {
-                        "youtube": {
-                            "player_client": ["default"],
-                            "player_js_version": ["actual"],
-                        }
-                    },
-                }
-
-                with YoutubeDL(ydl_opts) as ydl:  # type: ignore
-                    rc = ydl.download([item.url])
-                    if rc != 0:
-                        raise RuntimeError("yt-dlp failed")
-
-                files = [
-                    f
-                    for f in os.listdir(tmp)
-                    if not f.endswith(".part") and not f.endswith(".info.json")
-                ]
-                if not files:
-                    raise RuntimeError("No file produced")
-
-                files.sort(key=lambda f: os.path.getmtime(os.path.join(tmp, f)))
-                src = os.path.join(tmp, files[-1])
-
-                out = os.path.join(tmp, "preview.m4a")
-
-                start_sec = float(req.previewStartSec)
-                if getattr(item, "durationSec", 0) > 0 and item.durationSec <= 60:
-                    start_sec = 0.0
-
-                scraper.cut_to_m4a(
-                    src=src,
-                    dst=out,
-                    start=start_sec,
-                    dur=req.previewLenSec,
-                    bitrate_kbps=req.bitrateKbps,
+            if not finished and proc.returncode is None:
+                proc.kill()
+            await proc.wait()
+            if finished and proc.returncode != 0:
+                logger.warning(
+                    "ffmpeg preview stream exited with %s: %s",
+                    proc.returncode,
+                    (await stderr).decode(errors="replace")[-500:],
                 )
+            if sink:
+                await sink(None, ok=finished and proc.returncode == 0)
+        finally:
+            if _live_streams.get(key) is stream:
+                del _live_streams[key]
+            stream.finish()
+            await stack.aclose()
+
+
+async def _generate_preview(
+    req: PreviewRequest,
+    scraper: YoutubeScraper,
+    executor: MediaExecutor,
+    cache: Optional[PreviewCache] = None,
+    sources: Optional[SourceAudioCache] = None,
+) -> Tuple[bytes, Dict[str, str]]:
+    settings = get_settings()
+
+    def attempt(item):
+        return lambda: _generate_one(req, item, scraper, executor, cache, sources)
+
+    try:
+        _, result = await hedged(
+            [attempt(item) for item in req.candidates],
+            delay_sec=settings.preview_hedge_delay_sec,
+            max_parallel=settings.preview_hedge_max_parallel,
+        )
+    except BusyError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"All candidates failed: {e}")
+    return result
+
+
+async def _generate_one(
+    req: PreviewRequest,
+    item,
+    scraper: YoutubeScraper,
+    executor: MediaExecutor,
+    cache: Optional[PreviewCache],
+    sources: Optional[SourceAudioCache],
+) -> Tuple[bytes, Dict[str, str]]:
+    with tempfile.TemporaryDirectory() as tmp:
+        start_sec = _preview_start(req, item)
+        local = await asyncio.to_thread(sources.get, item.videoId) if sources else None
+        section = None
+        downloaded_bytes = 0
+
+        if local:
+            src, cut_start = local.path, start_sec
+            fmt = {"acodec": local.acodec, "abr": local.abr}
+        else:
+            (
+                src,
+                cut_start,
+                section,
+                downloaded_bytes,
+                fmt,
+            ) = await _download_for_cut(req, item, scraper, executor, tmp)
+            if sources and section is None:
+                # A full download is exactly what the source cache keeps
+                local = await asyncio.to_thread(sources.put, item.videoId, src, fmt)
+                if local:
+                    src = local.path
+            elif sources:
+                _prefetch_source(item, scraper, executor, sources)
+
+        out = os.path.join(tmp, "preview.m4a")
+
+        await scraper.cut_to_m4a(
+            src=src,
+            dst=out,
+            start=cut_start,
+            dur=req.previewLenSec,
+            bitrate_kbps=req.bitrateKbps,
+            copy=can_stream_copy(fmt.get("acodec"), fmt.get("abr"), req.bitrateKbps),
+        )
+        logger.info(
+            "Preview %s: downloaded %d bytes (%s)",
+            item.url,
+            downloaded_bytes,
+            "partial" if section else "local source" if local else "full",
+        )
 
-                headers = {
-                    "Content-Type": "audio/mp4",
-                    "X-Preview-Duration": str(req.previewLenSec),
-                    "X-Codec": "aac",
-                    "X-Bitrate-Kbps": str(req.bitrateKbps),
-                    "X-Source-Url": item.url,
-                    "X-Method": "scraping",
-                }
-
-                with open(out, "rb") as f:
-                    data = f.read()
-                shutil.rmtree(tmp, ignore_errors=True)
-
-                return StreamingResponse(
-                    io.BytesIO(data), media_type="audio/mp4", headers=headers
+        served_kbps = _served_kbps(req, fmt.get("acodec"), fmt.get("abr"))
+        headers = _preview_headers(req, item.url, served_kbps)
+        headers["X-Downloaded-Bytes"] = str(downloaded_bytes)
+        headers["X-Source-Cache"] = "HIT" if downloaded_bytes == 0 else "MISS"
+
+        data = await asyncio.to_thread(Path(out).read_bytes)
+
+        entry = None
+        if cache:
+            entry = await asyncio.to_thread(
+                cache.put,
+                _preview_cache_key(req, item),
+                data,
+                item.url,
+                served_kbps,
+                req.previewLenSec,
+            )
+        if entry:
+            headers["ETag"] = entry.etag
+            headers["Content-Location"] = f"/api/youtube/previews/{entry.digest}"
+
+        return data, headers
+
+
+async def _download_for_cut(
+    req: PreviewRequest,
+    item,
+    scraper: YoutubeScraper,
+    executor: MediaExecutor,
+    tmp: str,
+) -> Tuple[str, float, Optional[Tuple[float, float]], int, Dict[str, Any]]:
+    """Fetch the audio to cut from; returns (path, cut start, section, bytes, format)"""
+    settings = get_settings()
+    start_sec = _preview_start(req, item)
+
+    # Only fetch the previewed window plus a little pre-roll so the
+    # cut can land on a clean frame; fall back to the full track
+    section = None
+    cut_start = start_sec
+    if settings.preview_partial_download:
+        section_start = max(0.0, start_sec - settings.preview_preroll_sec)
+        section = (section_start, start_sec + req.previewLenSec + 1.0)
+        cut_start = start_sec - section_start
+
+    # One breaker call for both tries: a partial download that falls back to
+    # the full track and succeeds is not a media failure
+    async with _media(scraper):
+        try:
+            src, downloaded_bytes, fmt = await executor.run(
+                lambda cancel: scraper.download_audio(
+                    item.url,
+                    tmp,
+                    settings.youtube_cookies_path,
+                    section=section,
+                    cancel_event=cancel,
                 )
-        except ProviderError as e:
-            last_err = e
-            continue
+            )
         except Exception as e:
-            last_err = e
-            continue
+            # Throttled or unavailable: the full track would fail the same way
+            if (
+                section is None
+                or isinstance(e, BusyError)
+                or video_unavailable(e)
+                or THROTTLE_PATTERN.search(str(e))
+            ):
+                raise
+            logger.warning(
+                "Partial download failed for %s, fetching full track",
+                item.url,
+                exc_info=True,
+            )
+            for f in os.listdir(tmp):
+                os.remove(os.path.join(tmp, f))
+            section, cut_start = None, start_sec
+            src, downloaded_bytes, fmt = await executor.run(
+                lambda cancel: scraper.download_audio(
+                    item.url,
+                    tmp,
+                    settings.youtube_cookies_path,
+                    cancel_event=cancel,
+                )
+            )
 
-    raise HTTPException(status_code=502, detail=f"All candidates failed: {last_err}")
+    return src, cut_start, section, downloaded_bytes, fmt
 
 
 # def make_audio_provider(
@@ -1,16 +1,37 @@
+import asyncio
 import re
-import unicodedata
+import urllib.parse
 from abc import ABC, abstractmethod
-from typing import List, Optional, Protocol, Tuple, runtime_checkable
-
-from crawl4ai import (
-    AsyncWebCrawler,
-    CacheMode,
-    CrawlerRunConfig,
-    DefaultMarkdownGenerator,
-    PruningContentFilter,
+from contextlib import nullcontext
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Protocol,
+    Set,
+    Tuple,
+    runtime_checkable,
 )
-from unidecode import unidecode
+
+from crawl4ai import CrawlerRunConfig, RateLimiter, SemaphoreDispatcher
+
+from app.services.browser_pool import BrowserPool, lease_crawler
+from app.services.host_limiter import THROTTLE_PATTERN, HostLimiter, Lease
+from app.services.page_cache import PageCache
+from app.utils.logger import BusyError, ProviderError
+from app.utils.text import normalize_text
+
+
+# captcha / bot-wall vendors that answer with a 200 challenge page
+CHALLENGE_MARKUP = re.compile(
+    r"cf-chl-|challenge-platform|cf-turnstile|px-captcha|captcha-delivery\.com"
+    r"|<title>\s*just a moment",
+    re.I,
+)
+TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.I | re.S)
 
 
 @runtime_checkable
@@ -19,6 +40,10 @@ class AsyncClosable(Protocol):
         return None
 
 class LyricsBaseProvider(ABC):
+    crawler_pool: Optional[BrowserPool] = None
+    page_cache: Optional[PageCache] = None
+    limiter: Optional[HostLimiter] = None
+
     async def aclose(self) -> None:
         return None
 
@@ -26,74 +51,199 @@ class LyricsBaseProvider(ABC):
     async def get_lyric_url(self, title: str, artist: str) -> Optional[str]:
         raise NotImplementedError
 
+    async def get_album_lyric_urls(
+        self, album: str, artist: str, tracks: List[Tuple[str, Optional[int]]]
+    ) -> List[Optional[str]]:
+        """
+        Resolve lyric urls for (title, track_number) rows of one album.
+        - returns one entry per row, None where the row could not be matched
+        - providers without an album lookup match nothing, so callers fall back
+          to get_lyric_url per track
+        """
+        return [None] * len(tracks)
+
     @abstractmethod
     async def scrape_lyrics(self, url: str) -> Tuple[Optional[str], Optional[str]]:
         raise NotImplementedError("scrape_lyrics is not supported for this provider")
 
-    async def scrape_urls(self, urls: List[str]) -> Tuple[Optional[str], Optional[str]]:
-        prune_filer = PruningContentFilter(
-            threshold=0.5,
-            threshold_type="fixed",
-        )
-        fit_md_generator = DefaultMarkdownGenerator(
-            content_filter=prune_filer,
-            content_source="raw_html",
-            options={"ignore_links": True},
-        )
-        config = CrawlerRunConfig(
-            css_selector="div[data-lyrics-container='true']",
-            excluded_selector="div[data-exclude-from-selection='true']",
-            cache_mode=CacheMode.BYPASS,
-            markdown_generator=fit_md_generator,
-            scan_full_page=True,
-            remove_overlay_elements=True,
-            word_count_threshold=1,
+    def lyrics_run_config(self) -> CrawlerRunConfig:
+        raise NotImplementedError(
+            "lyrics_run_config is not supported for this provider"
         )
 
-        try:
-            async with AsyncWebCrawler() as crawler:
-                result = await crawler.arun_many(urls, config=config)
+    def page_fetcher(self, kind: str) -> str:
+        """Page cache fetcher name, e.g. genius:browser or musixmatch:search"""
+        return f"{type(self).__name__.lower()}:{kind}"
 
-            if not result.success:  # type: ignore
-                return None, str(result.error_message)  # type: ignore
+    def _slot(self, url: str):
+        if self.limiter is None:
+            return nullcontext(Lease())
+        return self.limiter.slot(urllib.parse.urlsplit(url).hostname or "")
 
-            md = result.markdown  # type: ignore
-            return md, None
-        except Exception as e:
-            return None, str(e)
+    async def _paced_arun(self, crawler, url: str, config: CrawlerRunConfig) -> Any:
+        """crawler.arun under a limiter slot on the page's host"""
+        async with self._slot(url) as lease:
+            result = await crawler.arun(url, config=config)
+            if self._check_challenge(result, lease) and result.success:
+                # a 200 challenge page must not be cached or parsed as lyrics
+                result.success = False
+                result.error_message = "Challenge page served instead of content"
+        return result
 
+    @staticmethod
+    def _check_challenge(result: Any, lease: Lease) -> bool:
+        """
+        Bot walls come back as 403/429 or as a captcha page instead of lyrics
+        - the captcha page is often served with HTTP 200, so the html is checked too
+        - reports the lease as throttled and returns True when one is seen
+        """
+        status = getattr(result, "status_code", None)
+        html = str(getattr(result, "html", "") or "")
+        title = TITLE_RE.search(html)
+        if (
+            status in (403, 429)
+            or THROTTLE_PATTERN.search(str(getattr(result, "error_message", "") or ""))
+            or CHALLENGE_MARKUP.search(html)
+            or (title and THROTTLE_PATTERN.search(title.group(1)))
+        ):
+            lease.throttle()
+            return True
+        return False
 
-    def normalize_text(self, text: str, keep_punctuation: bool = True) -> str:
-        if not text:
-            return ""
+    async def _paced_arun_many(
+        self, crawler, urls: List[str], config: CrawlerRunConfig, max_concurrency: int
+    ) -> Tuple[List[Any], Set[str]]:
+        """
+        One _paced_arun per url, at most `max_concurrency` at once
+        - returns (crawl results, urls the limiter turned away)
+        """
+        limit = asyncio.Semaphore(max_concurrency)
+        busy: Set[str] = set()
+
+        async def one(url: str) -> Any:
+            async with limit:
+                try:
+                    return await self._paced_arun(crawler, url, config)
+                except BusyError:
+                    busy.add(url)
+                    return None
+
+        results = await asyncio.gather(*(one(url) for url in urls))
+        return [r for r in results if r is not None], busy
+
+    async def _crawl(
+        self,
+        crawler,
+        url: str,
+        config: CrawlerRunConfig,
+        kind: str,
+        fetch: Optional[Callable[[], Awaitable[Any]]] = None,
+    ):
+        """
+        crawler.arun through the page cache
+        - cached pages are replayed as raw: HTML, so extraction runs without the network
+        - live crawls go through `fetch` when given (e.g. to hold a rate-limit slot)
+        - successful live crawls are recorded with their raw HTML
+        """
+        fetcher = self.page_fetcher(kind)
+        cache = self.page_cache
+        if cache:
+            page = (
+                await asyncio.to_thread(cache.lookup, url, fetcher)
+                if cache.reads
+                else None
+            )
+            if page:
+                return await crawler.arun(f"raw:{page.content}", config=config)
+            if cache.offline:
+                raise ProviderError(f"Offline: {fetcher} page not cached for {url}")
 
-        # Normalize unicode (NFKC = compatibility composition)
-        text = unicodedata.normalize("NFKC", text)
+        if fetch is not None:
+            result = await fetch()
+        else:
+            result = await crawler.arun(url, config=config)
+        if cache and result.success and result.html:  # type: ignore
+            await asyncio.to_thread(cache.put, url, fetcher, result.html)  # type: ignore
+        return result
 
-        # Lowercase
-        text = text.lower()
+    async def scrape_urls(
+        self, urls: List[str], max_concurrency: int = 4
+    ) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """
+        Crawl many lyric pages in a single arun_many dispatch.
+        - returns {url: (markdown, error)} with one entry per requested url,
+          except urls the host limiter turned away (BusyError), which are left out
+        - at most `max_concurrency` pages are open at the same time; with a
+          `limiter` every page load also holds a slot on its host
+        - pages found in the page cache are replayed instead of crawled
+        """
+        if not urls:
+            return {}
 
-        # Trim + collapse whitespace
-        text = " ".join(text.split())
+        fetcher = self.page_fetcher("browser")
+        pages: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        replay: Dict[str, str] = {}
+        live = []
+        busy: Set[str] = set()
+        cache = self.page_cache
+        for url in urls:
+            page = (
+                await asyncio.to_thread(cache.lookup, url, fetcher)
+                if cache and cache.reads
+                else None
+            )
+            if page:
+                replay[url] = page.content
+            elif self.page_cache and self.page_cache.offline:
+                pages[url] = (None, f"Offline: {fetcher} page not cached")
+            else:
+                live.append(url)
 
-        # Optionally strip punctuation
-        if not keep_punctuation:
-            text = re.sub(r"[^\w\s]", "", text)
+        config = self.lyrics_run_config()
+        dispatcher = SemaphoreDispatcher(
+            semaphore_count=max_concurrency,
+            rate_limiter=RateLimiter(
+                base_delay=(0.5, 1.5), max_delay=30.0, max_retries=2
+            ),
+        )
 
-        # Transliterate (optional, e.g. Cyrillic → Latin)
-        text = unidecode(text)
+        try:
+            async with lease_crawler(self.crawler_pool) as crawler:
+                for url, html in replay.items():
+                    result = await crawler.arun(f"raw:{html}", config=config)
+                    if not result.success:  # type: ignore
+                        pages[url] = (None, str(result.error_message))  # type: ignore
+                    else:
+                        pages[url] = (result.markdown, None)  # type: ignore
+
+                results = []
+                if live and self.limiter is not None:
+                    results, busy = await self._paced_arun_many(
+                        crawler, live, config, max_concurrency
+                    )
+                elif live:
+                    results = await crawler.arun_many(
+                        live, config=config, dispatcher=dispatcher
+                    )
+
+            for result in results:  # type: ignore
+                if not result.success:
+                    pages[result.url] = (None, str(result.error_message))
+                else:
+                    pages[result.url] = (result.markdown, None)
+                    if self.page_cache and result.html:
+                        await asyncio.to_thread(
+                            self.page_cache.put, result.url, fetcher, result.html
+                        )
+        except Exception as e:
+            return {url: (None, str(e)) for url in urls}
 
-        # Standardize spacing around dots so acronyms like "m . a . a . d" become "m.a.a.d"
-        # Only apply when punctuation is preserved.
-        if keep_punctuation:
-            # Remove spaces surrounding dots
-            text = re.sub(r"\s*\.\s*", ".", text)
-            # Collapse repeated dots (e.g. "..." -> ".")
-            text = re.sub(r"\.{2,}", ".", text)
-            # Trim stray spaces or dots at ends
-            text = text.strip(". ")
+        for url in urls:
+            if url not in busy:
+                pages.setdefault(url, (None, "No crawl result returned"))
+        return pages
 
-        return text
+    normalize_text = staticmethod(normalize_text)
 
     def clean_lyrics_markdown(self, md: str) -> str:
         """
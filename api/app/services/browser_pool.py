@@ -0,0 +1,154 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from crawl4ai import AsyncWebCrawler, BrowserConfig
+
+from app.utils.logger import ProviderError, logger
+
+
+class _Slot:
+    """One long-lived crawler (browser context) and its open tab count"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.crawler: Optional[AsyncWebCrawler] = None
+        self.in_use = 0
+        self.leases = 0
+        self.restarts = 0
+        self.lock = asyncio.Lock()
+
+
+class BrowserPool:
+    """
+    App-scoped pool of started AsyncWebCrawler instances shared by the scrapers.
+    - `contexts` crawlers are kept alive, each allowing up to `tabs` concurrent pages
+    - lease() hands out the least busy crawler and returns it on exit
+    - dead browsers are detected on lease and relaunched transparently
+    """
+
+    def __init__(
+        self,
+        contexts: int = 2,
+        tabs: int = 4,
+        browser_config: Optional[BrowserConfig] = None,
+        name: str = "default",
+    ):
+        if contexts < 1 or tabs < 1:
+            raise ValueError("contexts and tabs must be >= 1")
+
+        self.name = name
+        self.contexts = contexts
+        self.tabs = tabs
+        self.browser_config = browser_config
+        self._slots: List[_Slot] = [_Slot(i) for i in range(contexts)]
+        self._capacity = asyncio.Semaphore(contexts * tabs)
+        self._closed = False
+
+    async def start(self) -> None:
+        """Eagerly launch every browser; failures are retried on the next lease"""
+        for slot in self._slots:
+            try:
+                await self._ensure(slot)
+            except ProviderError:
+                logger.exception(
+                    "Browser pool %s: slot %d failed to start", self.name, slot.index
+                )
+
+    async def close(self) -> None:
+        self._closed = True
+        for slot in self._slots:
+            async with slot.lock:
+                await self._shutdown(slot)
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[AsyncWebCrawler]:
+        if self._closed:
+            raise ProviderError(f"Browser pool {self.name} is closed")
+
+        async with self._capacity:
+            slot = min(self._slots, key=lambda s: s.in_use)
+            slot.in_use += 1
+            try:
+                crawler = await self._ensure(slot)
+                slot.leases += 1
+                yield crawler
+            finally:
+                slot.in_use -= 1
+
+    def health(self) -> Dict[str, Any]:
+        healthy = sum(
+            1 for s in self._slots if s.crawler and self._is_healthy(s.crawler)
+        )
+        return {
+            "name": self.name,
+            "contexts": self.contexts,
+            "tabs": self.tabs,
+            "healthy": healthy,
+            "inUse": sum(s.in_use for s in self._slots),
+            "leases": sum(s.leases for s in self._slots),
+            "restarts": sum(s.restarts for s in self._slots),
+        }
+
+    def _is_healthy(self, crawler: AsyncWebCrawler) -> bool:
+        if not crawler.ready:
+            return False
+        manager = getattr(crawler.crawler_strategy, "browser_manager", None)
+        if manager is None:
+            return False
+        browser = getattr(manager, "browser", None)
+        if browser is not None:
+            return browser.is_connected()
+        return getattr(manager, "default_context", None) is not None
+
+    async def _ensure(self, slot: _Slot) -> AsyncWebCrawler:
+        async with slot.lock:
+            if slot.crawler is not None and self._is_healthy(slot.crawler):
+                return slot.crawler
+
+            if slot.crawler is not None:
+                logger.warning(
+                    "Browser pool %s: slot %d unhealthy, relaunching",
+                    self.name,
+                    slot.index,
+                )
+                await self._shutdown(slot)
+                slot.restarts += 1
+
+            crawler = AsyncWebCrawler(config=self.browser_config)
+            try:
+                await crawler.start()
+            except Exception as e:
+                try:
+                    await crawler.close()
+                except Exception:
+                    pass
+                raise ProviderError(f"Browser launch failed: {str(e)}") from e
+
+            slot.crawler = crawler
+            return crawler
+
+    async def _shutdown(self, slot: _Slot) -> None:
+        crawler, slot.crawler = slot.crawler, None
+        if crawler is None:
+            return
+        try:
+            await crawler.close()
+        except Exception:
+            logger.exception(
+                "Browser pool %s: error closing slot %d", self.name, slot.index
+            )
+
+
+@asynccontextmanager
+async def lease_crawler(
+    pool: Optional[BrowserPool], browser_config: Optional[BrowserConfig] = None
+) -> AsyncIterator[AsyncWebCrawler]:
+    """Borrow a crawler from the pool, or launch a one-off crawler when there is none"""
+    if pool is not None:
+        async with pool.lease() as crawler:
+            yield crawler
+        return
+
+    async with AsyncWebCrawler(config=browser_config) as crawler:
+        yield crawler
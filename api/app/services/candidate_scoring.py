@@ -0,0 +1,161 @@
+import math
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional
+
+from app.utils.text import normalize_text
+
+# Title words that mark a different recording, unless the track title has them too
+VARIANT_WORDS = frozenset(
+    {
+        "live",
+        "cover",
+        "remix",
+        "karaoke",
+        "instrumental",
+        "nightcore",
+        "reaction",
+        "acapella",
+        "8d",
+        "slowed",
+        "reverb",
+        "sped",
+        "bass",
+        "boosted",
+        "piano",
+        "tutorial",
+        "lesson",
+    }
+)
+
+VIEW_COUNT_PATTERN = re.compile(r"([\d.,]+)\s*([KMB])?", re.I)
+VIEW_SCALE = {"k": 1_000, "m": 1_000_000, "b": 1_000_000_000}
+
+# Weights, roughly "how many seconds of duration drift is this signal worth"
+W_TITLE = 4.0
+W_DURATION = 2.0
+W_TOPIC = 2.5
+W_ARTIST_CHANNEL = 1.5
+W_VERIFIED = 1.0
+W_OFFICIAL_AUDIO = 1.5
+W_OFFICIAL_VIDEO = 0.5
+W_LYRIC_VIDEO = -0.3
+W_VARIANT = -3.0
+W_VIEWS = 1.0
+
+
+def parse_view_count(text: Optional[str]) -> int:
+    """'1,234,567 views' / '1.2M views' / 'No views' -> int"""
+    if not text:
+        return 0
+    match = VIEW_COUNT_PATTERN.search(text)
+    if not match:
+        return 0
+    number, suffix = match.groups()
+    try:
+        if suffix:
+            return int(float(number.replace(",", "")) * VIEW_SCALE[suffix.lower()])
+        return int(number.replace(",", "").replace(".", ""))
+    except ValueError:
+        return 0
+
+
+def _tokens(text: str) -> FrozenSet[str]:
+    return frozenset(normalize_text(text, keep_punctuation=False).split())
+
+
+@dataclass(frozen=True)
+class TrackQuery:
+    """Normalized form of the requested track, computed once per ranking"""
+
+    title_tokens: FrozenSet[str]
+    artist_tokens: FrozenSet[str]
+    artist_key: str
+    duration_sec: int
+
+    @classmethod
+    def build(cls, title: str, artist: str, duration_sec: int) -> "TrackQuery":
+        return cls(
+            title_tokens=_tokens(title),
+            artist_tokens=_tokens(artist),
+            artist_key=normalize_text(artist, keep_punctuation=False).replace(" ", ""),
+            duration_sec=duration_sec,
+        )
+
+
+def score_candidate(
+    query: TrackQuery, candidate: Dict[str, Any], duration_threshold: int = 5
+) -> float:
+    """
+    Score one parsed search result against the requested track; higher is better.
+    - title: share of track title words present in the video title
+    - channel: "<artist> - Topic" (auto-generated album audio), VEVO or a
+      channel named like the artist, verified artist badge
+    - "official audio" over "official video" over lyric videos; live, cover,
+      remix, nightcore, ... are penalized unless the track title has them
+    - duration closeness within the match window and log-scaled views
+    """
+    video_tokens = _tokens(candidate.get("title", ""))
+    uploader = candidate.get("uploader") or ""
+    channel = normalize_text(uploader, keep_punctuation=False)
+    channel_key = channel.replace(" ", "")
+
+    score = 0.0
+
+    if query.title_tokens:
+        overlap = len(query.title_tokens & video_tokens) / len(query.title_tokens)
+        score += W_TITLE * overlap
+
+    diff = abs(candidate.get("durationSec", 0) - query.duration_sec)
+    score += W_DURATION * max(0.0, 1.0 - diff / max(duration_threshold, 1))
+
+    artist_in_channel = bool(query.artist_key) and query.artist_key in channel_key
+    if artist_in_channel:
+        score += W_TOPIC if channel.endswith(" topic") else W_ARTIST_CHANNEL
+    elif channel_key.endswith("vevo"):
+        # Label VEVO channels often abbreviate the artist name
+        score += W_ARTIST_CHANNEL / 2
+    elif query.artist_tokens and query.artist_tokens <= video_tokens:
+        # Re-uploads that at least name the artist
+        score += W_ARTIST_CHANNEL / 3
+
+    if candidate.get("verifiedArtist"):
+        score += W_VERIFIED
+
+    if "audio" in video_tokens and "audio" not in query.title_tokens:
+        score += W_OFFICIAL_AUDIO
+    elif {"official", "video"} <= video_tokens:
+        score += W_OFFICIAL_VIDEO
+    elif "lyrics" in video_tokens or "lyric" in video_tokens:
+        score += W_LYRIC_VIDEO
+
+    variants = (video_tokens & VARIANT_WORDS) - query.title_tokens
+    if variants:
+        score += W_VARIANT * min(len(variants), 2)
+
+    views = candidate.get("views") or 0
+    if views > 0:
+        # 10 views -> 0.1, 10M+ views -> 1.0
+        score += W_VIEWS * min(math.log10(views) / 7.0, 1.0)
+
+    return round(score, 3)
+
+
+def rank_candidates(
+    candidates: List[Dict[str, Any]],
+    title: str,
+    artist: str,
+    duration_sec: int,
+    duration_threshold: int = 5,
+) -> List[Dict[str, Any]]:
+    """
+    Return `candidates` best first with a "score" key added to each.
+    - ties keep the closer duration first
+    """
+    query = TrackQuery.build(title, artist, duration_sec)
+    for candidate in candidates:
+        candidate["score"] = score_candidate(query, candidate, duration_threshold)
+    return sorted(
+        candidates,
+        key=lambda c: (-c["score"], abs(c.get("durationSec", 0) - duration_sec)),
+    )
@@ -1,53 +1,182 @@
 # app/genius.py
-from typing import Any, Dict, Optional, Tuple
+import asyncio
+import importlib.util
+import json
+from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
+import lxml.html
 from crawl4ai import (
-    AsyncWebCrawler,
     CacheMode,
     CrawlerRunConfig,
     DefaultMarkdownGenerator,
     PruningContentFilter,
 )
+from lxml import etree
+from lxml.cssselect import CSSSelector
 
 from app.services.base import LyricsBaseProvider
-from app.utils.logger import NoResultsError, ProviderError
+from app.services.browser_pool import BrowserPool, lease_crawler
+from app.services.host_limiter import HostLimiter, LimitedTransport
+from app.services.page_cache import PageCache
+from app.utils.logger import BusyError, NoResultsError, ProviderError, logger
+from app.utils.retry import RetryTransport
+from app.utils.text import title_key
+
+# Compiled once; Genius serves lyrics as static markup so no browser is needed to read them
+LYRICS_CONTAINER = CSSSelector("div[data-lyrics-container='true']")
+LYRICS_EXCLUDED = CSSSelector("div[data-exclude-from-selection='true']")
+
+PAGE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en",
+}
+
+API_BASE_URL = "https://api.genius.com"
+
+
+def api_headers(access_token: str) -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {access_token}",
+        "Accept": "application/json",
+        "User-Agent": "DailyBar/1.0 (+https://dailybar.netlify.app/)",
+    }
+
+
+def _pooled_client(
+    max_connections: int,
+    max_keepalive_connections: int,
+    retries: int,
+    limiter: Optional[HostLimiter],
+    **kwargs: Any,
+) -> httpx.AsyncClient:
+    # limits and http2 belong to the transport once one is passed in
+    transport: httpx.AsyncBaseTransport = httpx.AsyncHTTPTransport(
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=60.0,
+        ),
+    )
+    # Retries go through the limiter too, so each attempt is paced and counted
+    if limiter:
+        transport = LimitedTransport(transport, limiter)
+    return httpx.AsyncClient(
+        transport=RetryTransport(transport, retries=retries),
+        timeout=httpx.Timeout(15.0, connect=5.0, pool=5.0),
+        **kwargs,
+    )
+
+
+def make_genius_client(
+    access_token: str,
+    max_connections: int = 20,
+    max_keepalive_connections: int = 10,
+    retries: int = 3,
+    limiter: Optional[HostLimiter] = None,
+) -> httpx.AsyncClient:
+    """
+    Keep-alive client for api.genius.com, meant to live as long as the app.
+    - HTTP/2 is negotiated when the h2 package is installed
+    - GETs are retried on 429/5xx with jittered backoff, honoring Retry-After
+    - waiting on a full pool times out after 5 s instead of queueing forever
+    - `limiter` paces requests across workers (see HostLimiter)
+    """
+    return _pooled_client(
+        max_connections,
+        max_keepalive_connections,
+        retries,
+        limiter,
+        base_url=API_BASE_URL,
+        headers=api_headers(access_token),
+    )
+
+
+def make_genius_page_client(
+    max_connections: int = 20,
+    max_keepalive_connections: int = 10,
+    retries: int = 1,
+    limiter: Optional[HostLimiter] = None,
+) -> httpx.AsyncClient:
+    """Keep-alive client for genius.com lyric pages; carries no bearer token"""
+    return _pooled_client(
+        max_connections,
+        max_keepalive_connections,
+        retries,
+        limiter,
+        headers=PAGE_HEADERS,
+        follow_redirects=True,
+    )
 
 
 class Genius(LyricsBaseProvider):
-    BASE_URL = "https://api.genius.com"
+    """
+    Genius API + lyric page provider.
+    - pass app-lifetime `client` / `page_client` pools to share warm connections
+      between requests; clients created here are closed by aclose()
+    - `page_cache` records API responses and lyric pages as fetched (see PageCache)
+    - `limiter` paces browser crawls of genius.com; the http clients are paced
+      by their own LimitedTransport
+    """
+
+    BASE_URL = API_BASE_URL
 
-    def __init__(self, access_token: str, client: Optional[httpx.AsyncClient] = None):
+    def __init__(
+        self,
+        access_token: str,
+        client: Optional[httpx.AsyncClient] = None,
+        crawler_pool: Optional[BrowserPool] = None,
+        page_client: Optional[httpx.AsyncClient] = None,
+        page_cache: Optional[PageCache] = None,
+        limiter: Optional[HostLimiter] = None,
+    ):
         if not access_token:
             raise ValueError("Access token must be provided")
 
         self.access_token = access_token
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "Accept": "application/json",
-            "User-Agent": "DailyBar/1.0 (+https://dailybar.netlify.app/)",
-        }
-        self.client = client or httpx.AsyncClient(
-            base_url=self.BASE_URL, timeout=10.0, headers=headers
-        )
+        self.crawler_pool = crawler_pool
+        self.page_cache = page_cache
+        self.limiter = limiter
+        self._owns_client = client is None
+        self.client = client or make_genius_client(access_token)
+        # Lyric pages live on genius.com, so they must not go through the
+        # api client that carries the bearer token
+        self._owns_page_client = page_client is None
+        self.page_client = page_client or make_genius_page_client()
 
     async def aclose(self) -> None:
-        await self.client.aclose()
+        if self._owns_client:
+            await self.client.aclose()
+        if self._owns_page_client:
+            await self.page_client.aclose()
 
     async def _get(
         self, path: str, params: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        try:
-            resp = await self.client.get(url=path, params=params, timeout=15)
+        request = self.client.build_request("GET", path, params=params)
+
+        async def fetch() -> str:
+            resp = await self.client.send(request)
             resp.raise_for_status()
-            data = resp.json()
+            return resp.text
+
+        try:
+            if self.page_cache:
+                text = await self.page_cache.through(
+                    str(request.url), self.page_fetcher("api"), fetch, "json"
+                )
+            else:
+                text = await fetch()
+            data = json.loads(text or "{}")
 
             # Genius sometimes returns 200 with an error in "meta"
             if "meta" in data and data["meta"].get("status", 200) >= 400:
                 raise ProviderError(f"Genius API error in response: {data['meta']}")
 
             if not data:
-                raise ProviderError(f"Empty response body for: {resp.url}")
+                raise ProviderError(f"Empty response body for: {request.url}")
 
             payload = data.get("response", data)
             if not payload:
@@ -100,14 +229,101 @@ class Genius(LyricsBaseProvider):
 
             url = await self._url_for_track(track_id)
             return url
-        except (NoResultsError, ProviderError):
+        except (NoResultsError, ProviderError, BusyError):
             # Raise domain errors unchanged so the route can translate them to proper HTTP codes
             raise
         except Exception as e:
             # Any other unexpected error is a provider failure from the app's perspective
             raise ProviderError(f"Genius client error: {str(e)}") from e
 
-    async def scrape_lyrics(self, url: str) -> Tuple[Optional[str], Optional[str]]:
+    async def _find_album_id(self, album: str, artist: str) -> Optional[int]:
+        """Search hits are songs, so the album id comes from the first hit on that album"""
+        res = await self._search(album, artist, per_page=5)
+        album_key = title_key(album)
+
+        for hit in res.get("hits", []):
+            if hit.get("type") != "song":
+                continue
+            song_id = hit.get("result", {}).get("id")
+            if not song_id:
+                continue
+
+            song = (await self._get(f"/songs/{song_id}")).get("song") or {}
+            song_album = song.get("album") or {}
+            if (
+                song_album.get("id")
+                and title_key(song_album.get("name", "")) == album_key
+            ):
+                return song_album["id"]
+
+        return None
+
+    async def _album_tracks(self, album_id: int, max_pages: int = 5) -> List[Dict]:
+        tracks: List[Dict] = []
+        page: Optional[int] = 1
+        while page and page <= max_pages:
+            res = await self._get(
+                f"/albums/{album_id}/tracks", {"per_page": 50, "page": page}
+            )
+            tracks.extend(res.get("tracks", []))
+            page = res.get("next_page")
+        return tracks
+
+    async def get_album_lyric_urls(
+        self, album: str, artist: str, tracks: List[Tuple[str, Optional[int]]]
+    ) -> List[Optional[str]]:
+        """
+        Match our track list against the Genius album track list
+        - costs one search, a few /songs lookups and one /tracks call per 50 tracks
+          instead of two calls per track
+        - rows match on normalized title, or on track number when the titles agree
+          on a prefix (e.g. "Song" vs "Song - 2011 Remaster")
+        """
+        try:
+            album_id = await self._find_album_id(album, artist)
+            if not album_id:
+                logger.info("Genius: no album match for %s - %s", album, artist)
+                return [None] * len(tracks)
+            album_tracks = await self._album_tracks(album_id)
+        except (NoResultsError, ProviderError) as e:
+            logger.info("Genius album lookup failed for %s - %s: %s", album, artist, e)
+            return [None] * len(tracks)
+
+        by_title: Dict[str, str] = {}
+        by_number: Dict[int, Tuple[str, str]] = {}
+        for entry in album_tracks:
+            song = entry.get("song") or {}
+            url = song.get("url")
+            if not url:
+                continue
+            key = title_key(song.get("title", ""))
+            by_title.setdefault(key, url)
+            if entry.get("number"):
+                by_number[entry["number"]] = (key, url)
+
+        urls: List[Optional[str]] = []
+        for title, number in tracks:
+            key = title_key(title)
+            url = by_title.get(key)
+            if not url and number in by_number:
+                other_key, other_url = by_number[number]
+                if (
+                    key
+                    and other_key
+                    and (key.startswith(other_key) or other_key.startswith(key))
+                ):
+                    url = other_url
+            urls.append(url)
+
+        logger.info(
+            "Genius album %s: matched %d/%d tracks",
+            album_id,
+            sum(1 for u in urls if u),
+            len(tracks),
+        )
+        return urls
+
+    def lyrics_run_config(self) -> CrawlerRunConfig:
         prune_filer = PruningContentFilter(
             threshold=0.5,
             threshold_type="fixed",
@@ -126,15 +342,119 @@ class Genius(LyricsBaseProvider):
             remove_overlay_elements=True,
             word_count_threshold=1,
         )
+        return config
 
+    def _parse_lyrics_html(self, html: str) -> Optional[str]:
+        """
+        Extract lyrics from a Genius song page without rendering it
+        - one line per <br>, section headers like [Verse 1] kept on their own line
+        - header/annotation blocks marked data-exclude-from-selection are dropped
+        """
         try:
-            async with AsyncWebCrawler() as crawler:
-                result = await crawler.arun(url, config=config)
+            doc = lxml.html.fromstring(html)
+        except (ValueError, etree.ParserError):
+            return None
+
+        blocks = []
+        for container in LYRICS_CONTAINER(doc):
+            for excluded in LYRICS_EXCLUDED(container):
+                excluded.drop_tree()
+            for br in container.iter("br"):
+                br.tail = "\n" + (br.tail or "")
+            text = container.text_content().strip()
+            if text:
+                blocks.append(text)
+
+        return "\n".join(blocks) or None
+
+    async def _fetch_page(self, url: str) -> Optional[str]:
+        try:
+            resp = await self.page_client.get(url)
+            resp.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.info("Genius static fetch failed for %s: %s", url, str(e))
+            return None
+        return resp.text
+
+    async def _scrape_lyrics_static(self, url: str) -> Optional[str]:
+        if not self.page_cache:
+            html = await self._fetch_page(url)
+        else:
+            try:
+                html = await self.page_cache.through(
+                    url, self.page_fetcher("static"), lambda: self._fetch_page(url)
+                )
+            except ProviderError as e:
+                # Offline miss: the browser path may still have the page
+                logger.info(str(e))
+                return None
+
+        return self._parse_lyrics_html(html) if html else None
+
+    async def scrape_lyrics(self, url: str) -> Tuple[Optional[str], Optional[str]]:
+        md = await self._scrape_lyrics_static(url)
+        if md:
+            return md, None
+
+        logger.info("Genius static parse found no lyrics, crawling %s", url)
+        return await self._scrape_lyrics_browser(url)
+
+    async def scrape_urls(
+        self, urls: List[str], max_concurrency: int = 4
+    ) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """
+        Static fetch first, the browser crawl only for pages it could not parse
+        - URLs the host limiter turned away (BusyError) are left out of the
+          result: crawling them would hit a throttling genius.com harder
+        """
+        limit = asyncio.Semaphore(max_concurrency)
+        busy = set()
+
+        async def fetch(url: str) -> Optional[str]:
+            async with limit:
+                try:
+                    return await self._scrape_lyrics_static(url)
+                except BusyError:
+                    busy.add(url)
+                    return None
+
+        static = await asyncio.gather(*(fetch(url) for url in urls))
+        pages: Dict[str, Tuple[Optional[str], Optional[str]]] = {
+            url: (md, None) for url, md in zip(urls, static) if md
+        }
+
+        remaining = [url for url in urls if url not in pages and url not in busy]
+        if busy:
+            logger.warning(
+                "genius.com is rate limited, skipping %d of %d pages",
+                len(busy),
+                len(urls),
+            )
+        if remaining:
+            pages.update(await super().scrape_urls(remaining, max_concurrency))
+        return pages
+
+    async def _scrape_lyrics_browser(
+        self, url: str
+    ) -> Tuple[Optional[str], Optional[str]]:
+        config = self.lyrics_run_config()
+
+        try:
+            async with lease_crawler(self.crawler_pool) as crawler:
+                result = await self._crawl(
+                    crawler,
+                    url,
+                    config,
+                    "browser",
+                    lambda: self._paced_arun(crawler, url, config),
+                )
 
             if not result.success:  # type: ignore
                 return None, str(result.error_message)  # type: ignore
 
             md = result.markdown  # type: ignore
             return md, None
+        except BusyError:
+            raise
         except Exception as e:
             return None, str(e)
@@ -0,0 +1,366 @@
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+
+from app.utils.logger import BusyError, logger
+
+
+@dataclass(frozen=True)
+class HostPolicy:
+    """Ceilings an upstream host grows back to; the floors it never drops below"""
+
+    rate_per_sec: float
+    burst: float
+    max_concurrency: int
+    min_rate_per_sec: float = 0.2
+    min_concurrency: int = 1
+
+
+DEFAULT_POLICIES: Dict[str, HostPolicy] = {
+    "api.genius.com": HostPolicy(rate_per_sec=5.0, burst=10, max_concurrency=8),
+    "genius.com": HostPolicy(rate_per_sec=4.0, burst=8, max_concurrency=8),
+    "www.musixmatch.com": HostPolicy(rate_per_sec=1.0, burst=3, max_concurrency=2),
+    "www.youtube.com": HostPolicy(rate_per_sec=5.0, burst=10, max_concurrency=12),
+    "googlevideo": HostPolicy(rate_per_sec=3.0, burst=6, max_concurrency=6),
+}
+
+# yt-dlp / crawler errors that mean "slow down" rather than "this item is broken"
+THROTTLE_PATTERN = re.compile(
+    r"\b429\b|too many requests|sign in to confirm (?!your age)|captcha|rate.?limit",
+    re.I,
+)
+
+
+def host_key(host: str) -> str:
+    """Policy key for a hostname: media edge hosts share the "googlevideo" key"""
+    host = host.lower()
+    if host.endswith(".googlevideo.com"):
+        return "googlevideo"
+    if host in ("youtube.com", "m.youtube.com", "music.youtube.com"):
+        return "www.youtube.com"
+    if host == "musixmatch.com":
+        return "www.musixmatch.com"
+    return host
+
+
+class Lease:
+    """One admitted request; throttle() reports a 429/503/challenge on release"""
+
+    def __init__(self, host: Optional[str] = None, lease_id: Optional[int] = None):
+        self.host = host
+        self.lease_id = lease_id
+        self.throttled = False
+
+    def throttle(self) -> None:
+        self.throttled = True
+
+
+class HostLimiter:
+    """
+    Token bucket + AIMD concurrency limit per upstream host, shared by every
+    worker on the machine through one SQLite file.
+    - a request needs a token (refilled at the host's current rate, up to
+      `burst`) and a free slot under the host's current concurrency limit
+    - a throttled response halves both rate and concurrency (at most once per
+      `cut_interval_sec`, so one burst of 429s counts once) and empties the bucket
+    - every success adds 1/limit to the concurrency limit and a small step to
+      the rate, growing back towards the policy ceilings
+    - leases older than `lease_ttl_sec` are dropped, so a crashed worker cannot
+      hold slots forever
+    - hosts without a policy pass through unlimited
+    - the SQLite transactions run in worker threads, so a worker waiting on
+      the file lock does not stall its event loop
+    """
+
+    def __init__(
+        self,
+        path: str,
+        policies: Optional[Dict[str, HostPolicy]] = None,
+        acquire_timeout_sec: float = 30.0,
+        lease_ttl_sec: float = 600.0,
+        cut_interval_sec: float = 1.0,
+    ):
+        self.policies = policies if policies is not None else DEFAULT_POLICIES
+        self.acquire_timeout_sec = acquire_timeout_sec
+        self.lease_ttl_sec = lease_ttl_sec
+        self.cut_interval_sec = cut_interval_sec
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Autocommit mode: every read-modify-write takes BEGIN IMMEDIATE so the
+        # workers serialize on the file lock
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, timeout=5.0, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS hosts (
+                host TEXT PRIMARY KEY,
+                rate REAL NOT NULL,
+                concurrency REAL NOT NULL,
+                tokens REAL NOT NULL,
+                refilled_at REAL NOT NULL,
+                cut_at REAL NOT NULL DEFAULT 0,
+                ok INTEGER NOT NULL DEFAULT 0,
+                throttled INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS leases (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                host TEXT NOT NULL,
+                acquired_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS leases_host ON leases (host)")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @asynccontextmanager
+    async def slot(self, host: str) -> AsyncIterator[Lease]:
+        """
+        Hold a slot on `host` for the duration of the block.
+        - errors that look like throttling (see THROTTLE_PATTERN) shrink the limits;
+          other errors leave them as they are
+        """
+        lease = await self.acquire(host)
+        outcome: Optional[bool] = True
+        try:
+            yield lease
+        except BaseException as e:
+            outcome = False if THROTTLE_PATTERN.search(str(e)) else None
+            raise
+        finally:
+            if lease.throttled:
+                outcome = False
+            await self.release(lease, outcome)
+
+    async def acquire(self, host: str) -> Lease:
+        key = host_key(host)
+        policy = self.policies.get(key)
+        if policy is None:
+            return Lease()
+
+        deadline = time.monotonic() + self.acquire_timeout_sec
+        while True:
+            attempt = asyncio.ensure_future(
+                asyncio.to_thread(self._try_acquire, key, policy)
+            )
+            try:
+                lease_id, wait = await asyncio.shield(attempt)
+            except asyncio.CancelledError:
+                # The thread finishes anyway; hand back a lease it may have taken
+                attempt.add_done_callback(lambda done: self._orphaned(key, done))
+                raise
+            except sqlite3.Error:
+                logger.exception("Host limiter unavailable for %s, not limiting", key)
+                return Lease()
+            if lease_id is not None:
+                return Lease(key, lease_id)
+            if time.monotonic() + wait > deadline:
+                raise BusyError(f"Upstream {key} is rate limited, try again later")
+            await asyncio.sleep(wait)
+
+    def _orphaned(self, key: str, attempt: asyncio.Future) -> None:
+        if attempt.cancelled() or attempt.exception() is not None:
+            return
+        lease_id, _ = attempt.result()
+        if lease_id is not None:
+            asyncio.get_running_loop().run_in_executor(
+                None, self._release, Lease(key, lease_id), None
+            )
+
+    async def release(self, lease: Lease, ok: Optional[bool] = True) -> None:
+        """`ok` True grows the limits, False shrinks them, None leaves them be"""
+        if lease.lease_id is None or lease.host is None:
+            return
+        await asyncio.to_thread(self._release, lease, ok)
+
+    def _release(self, lease: Lease, ok: Optional[bool]) -> None:
+        policy = self.policies[lease.host]  # type: ignore[index]
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._conn.execute(
+                        "DELETE FROM leases WHERE id = ?", (lease.lease_id,)
+                    )
+                    if ok is not None:
+                        self._adjust(lease.host, policy, ok, now)
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error:
+            logger.exception("Host limiter release failed for %s", lease.host)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT h.host, h.rate, h.concurrency, h.tokens, h.ok, h.throttled,"
+                    " (SELECT count(*) FROM leases l WHERE l.host = h.host)"
+                    " FROM hosts h"
+                ).fetchall()
+        except sqlite3.Error:
+            logger.exception("Host limiter stats failed")
+            return {}
+        return {
+            host: {
+                "ratePerSec": round(rate, 3),
+                "maxRatePerSec": self.policies[host].rate_per_sec,
+                "concurrency": int(concurrency),
+                "maxConcurrency": self.policies[host].max_concurrency,
+                "tokens": round(tokens, 2),
+                "inFlight": inflight,
+                "ok": ok,
+                "throttled": throttled,
+            }
+            for host, rate, concurrency, tokens, ok, throttled, inflight in rows
+            if host in self.policies
+        }
+
+    def _try_acquire(self, key: str, policy: HostPolicy) -> Tuple[Optional[int], float]:
+        """Returns (lease id, 0) when admitted, else (None, seconds to wait)"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rate, concurrency, tokens = self._ensure(key, policy, now)
+                self._conn.execute(
+                    "DELETE FROM leases WHERE host = ? AND acquired_at < ?",
+                    (key, now - self.lease_ttl_sec),
+                )
+                (inflight,) = self._conn.execute(
+                    "SELECT count(*) FROM leases WHERE host = ?", (key,)
+                ).fetchone()
+
+                if tokens < 1.0:
+                    result: Tuple[Optional[int], float] = (
+                        None,
+                        max(0.02, (1.0 - tokens) / rate),
+                    )
+                elif inflight >= max(policy.min_concurrency, int(concurrency)):
+                    result = (None, 0.05)
+                else:
+                    self._conn.execute(
+                        "UPDATE hosts SET tokens = ? WHERE host = ?",
+                        (tokens - 1.0, key),
+                    )
+                    lease_id = self._conn.execute(
+                        "INSERT INTO leases (host, acquired_at) VALUES (?, ?)",
+                        (key, now),
+                    ).lastrowid
+                    result = (lease_id, 0.0)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return result
+
+    def _ensure(
+        self, key: str, policy: HostPolicy, now: float
+    ) -> Tuple[float, float, float]:
+        """Load (and refill) a host's bucket, creating it at the ceilings (lock held)"""
+        self._conn.execute(
+            "INSERT OR IGNORE INTO hosts (host, rate, concurrency, tokens, refilled_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (key, policy.rate_per_sec, policy.max_concurrency, policy.burst, now),
+        )
+        rate, concurrency, tokens, refilled_at = self._conn.execute(
+            "SELECT rate, concurrency, tokens, refilled_at FROM hosts WHERE host = ?",
+            (key,),
+        ).fetchone()
+        # Policies may have been lowered since the row was written
+        rate = min(rate, policy.rate_per_sec)
+        concurrency = min(concurrency, policy.max_concurrency)
+        tokens = min(policy.burst, tokens + max(0.0, now - refilled_at) * rate)
+        self._conn.execute(
+            "UPDATE hosts SET rate = ?, concurrency = ?, tokens = ?, refilled_at = ?"
+            " WHERE host = ?",
+            (rate, concurrency, tokens, now, key),
+        )
+        return rate, concurrency, tokens
+
+    def _adjust(self, key: str, policy: HostPolicy, ok: bool, now: float) -> None:
+        """AIMD step (lock and transaction held)"""
+        if ok:
+            self._conn.execute(
+                "UPDATE hosts SET ok = ok + 1,"
+                " concurrency = min(?, concurrency + 1.0 / max(concurrency, 1)),"
+                " rate = min(?, rate + ?)"
+                " WHERE host = ?",
+                (
+                    policy.max_concurrency,
+                    policy.rate_per_sec,
+                    policy.rate_per_sec / 50,
+                    key,
+                ),
+            )
+            return
+
+        cut = self._conn.execute(
+            "UPDATE hosts SET throttled = throttled + 1,"
+            " concurrency = max(?, concurrency / 2), rate = max(?, rate / 2),"
+            " tokens = min(tokens, 0), cut_at = ?"
+            " WHERE host = ? AND cut_at < ?",
+            (
+                policy.min_concurrency,
+                policy.min_rate_per_sec,
+                now,
+                key,
+                now - self.cut_interval_sec,
+            ),
+        ).rowcount
+        if cut:
+            logger.warning("Upstream %s throttled us, backing off", key)
+        else:
+            self._conn.execute(
+                "UPDATE hosts SET throttled = throttled + 1 WHERE host = ?", (key,)
+            )
+
+
+class LimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Routes every request through HostLimiter.
+    - 429 and 503 responses, and redirects to a challenge page (YouTube
+      consent/"sorry" pages), count as throttling
+    - the slot is released once response headers arrive, so streamed bodies
+      do not hold it
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, limiter: HostLimiter):
+        self._transport = transport
+        self.limiter = limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        async with self.limiter.slot(request.url.host) as lease:
+            response = await self._transport.handle_async_request(request)
+            location = response.headers.get("Location", "")
+            if response.status_code in (429, 503) or (
+                response.is_redirect
+                and ("/sorry/" in location or "consent." in location)
+            ):
+                lease.throttle()
+            return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
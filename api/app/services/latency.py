@@ -0,0 +1,96 @@
+import math
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence
+
+
+class LatencyTracker:
+    """
+    Rolling per-provider latency of successful calls, kept per worker process.
+    - the last `window` samples of each provider are kept
+    - a call cancelled after losing a race is a censored sample: the time it had
+      run is only a lower bound on its latency. Censored samples are kept apart
+      and can only raise a percentile: those above the estimate from completed
+      calls join it, those below it say nothing and are ignored. Without them a
+      provider that usually starts second would only be measured when it wins.
+    - order() puts the provider with the lowest median first; providers without
+      samples keep their given order behind the measured ones
+    - hedge_delay() is the given percentile of a provider's latency, clamped,
+      or `default_sec` until `min_samples` calls have been seen
+    """
+
+    def __init__(
+        self,
+        window: int = 200,
+        min_samples: int = 10,
+        default_sec: float = 3.0,
+        min_sec: float = 0.5,
+        max_sec: float = 10.0,
+    ):
+        self.window = window
+        self.min_samples = min_samples
+        self.default_sec = default_sec
+        self.min_sec = min_sec
+        self.max_sec = max_sec
+        self._samples: Dict[str, Deque[float]] = {}
+        self._failures: Dict[str, int] = {}
+        self._censored: Dict[str, Deque[float]] = {}
+
+    def record(self, name: str, elapsed_sec: float) -> None:
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = deque(maxlen=self.window)
+        samples.append(elapsed_sec)
+
+    def record_censored(self, name: str, elapsed_sec: float) -> None:
+        """A call cancelled after `elapsed_sec`: it would have taken longer"""
+        censored = self._censored.get(name)
+        if censored is None:
+            censored = self._censored[name] = deque(maxlen=self.window)
+        censored.append(elapsed_sec)
+
+    def record_failure(self, name: str) -> None:
+        self._failures[name] = self._failures.get(name, 0) + 1
+
+    def percentile(self, name: str, pct: float) -> Optional[float]:
+        samples = self._samples.get(name)
+        if not samples:
+            return None
+        estimate = self._rank(sorted(samples), pct)
+        raising = [c for c in self._censored.get(name, ()) if c > estimate]
+        if not raising:
+            return estimate
+        return self._rank(sorted([*samples, *raising]), pct)
+
+    @staticmethod
+    def _rank(ordered: List[float], pct: float) -> float:
+        return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+    def order(self, names: Sequence[str]) -> List[str]:
+        def median(name: str) -> float:
+            samples = self._samples.get(name)
+            if not samples or len(samples) < self.min_samples:
+                return math.inf
+            return self.percentile(name, 50)  # type: ignore[return-value]
+
+        # sorted() is stable, so unmeasured providers keep the caller's order
+        return sorted(names, key=median)
+
+    def hedge_delay(self, name: str, pct: float = 90) -> float:
+        samples = self._samples.get(name)
+        if not samples or len(samples) < self.min_samples:
+            return self.default_sec
+        delay = self.percentile(name, pct) or self.default_sec
+        return min(self.max_sec, max(self.min_sec, delay))
+
+    def stats(self) -> Dict[str, Dict[str, Optional[float]]]:
+        return {
+            name: {
+                "samples": len(samples),
+                "failures": self._failures.get(name, 0),
+                "censored": len(self._censored.get(name, ())),
+                "p50": self.percentile(name, 50),
+                "p90": self.percentile(name, 90),
+                "hedgeDelay": self.hedge_delay(name),
+            }
+            for name, samples in self._samples.items()
+        }
@@ -0,0 +1,141 @@
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from app.utils.logger import logger
+
+
+@dataclass
+class CachedLyrics:
+    lyrics: Optional[str]
+    url: Optional[str]
+    error: Optional[str]
+
+    @property
+    def is_miss(self) -> bool:
+        """Negative entry recorded for a track that had no lyrics (404)"""
+        return self.lyrics is None
+
+
+class LyricsCache:
+    """
+    Durable SQLite cache of cleaned lyrics, shared by every worker on the host.
+    - keys are source + normalized title + normalized artist (normalize before calling)
+    - hits expire after `ttl_sec`, 404 misses after `negative_ttl_sec`
+    - least recently read rows are evicted once `max_entries` is exceeded
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_sec: int = 30 * 24 * 3600,
+        negative_ttl_sec: int = 6 * 3600,
+        max_entries: int = 50_000,
+    ):
+        self.path = path
+        self.ttl_sec = ttl_sec
+        self.negative_ttl_sec = negative_ttl_sec
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS lyrics (
+                source TEXT NOT NULL,
+                title TEXT NOT NULL,
+                artist TEXT NOT NULL,
+                lyrics TEXT,
+                url TEXT,
+                error TEXT,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (source, title, artist)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS lyrics_accessed_at ON lyrics (accessed_at)"
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get(self, source: str, title: str, artist: str) -> Optional[CachedLyrics]:
+        now = time.time()
+        try:
+            with self._lock, self._conn:
+                row = self._conn.execute(
+                    "SELECT lyrics, url, error, expires_at FROM lyrics"
+                    " WHERE source = ? AND title = ? AND artist = ?",
+                    (source, title, artist),
+                ).fetchone()
+                if row is None:
+                    return None
+
+                if row[3] <= now:
+                    self._conn.execute(
+                        "DELETE FROM lyrics WHERE source = ? AND title = ? AND artist = ?",
+                        (source, title, artist),
+                    )
+                    return None
+
+                self._conn.execute(
+                    "UPDATE lyrics SET accessed_at = ?"
+                    " WHERE source = ? AND title = ? AND artist = ?",
+                    (now, source, title, artist),
+                )
+                return CachedLyrics(lyrics=row[0], url=row[1], error=row[2])
+        except sqlite3.Error:
+            logger.exception("Lyrics cache read failed for %s - %s", title, artist)
+            return None
+
+    def put(
+        self, source: str, title: str, artist: str, lyrics: str, url: Optional[str]
+    ) -> None:
+        self._write(source, title, artist, lyrics, url, None, self.ttl_sec)
+
+    def put_miss(self, source: str, title: str, artist: str, error: str) -> None:
+        self._write(source, title, artist, None, None, error, self.negative_ttl_sec)
+
+    def _write(
+        self,
+        source: str,
+        title: str,
+        artist: str,
+        lyrics: Optional[str],
+        url: Optional[str],
+        error: Optional[str],
+        ttl_sec: int,
+    ) -> None:
+        if ttl_sec <= 0:
+            return
+
+        now = time.time()
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO lyrics"
+                    " (source, title, artist, lyrics, url, error, expires_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (source, title, artist, lyrics, url, error, now + ttl_sec, now),
+                )
+                self._conn.execute(
+                    "DELETE FROM lyrics WHERE rowid IN ("
+                    " SELECT rowid FROM lyrics ORDER BY accessed_at ASC"
+                    " LIMIT max(0, (SELECT count(*) FROM lyrics) - ?))",
+                    (self.max_entries,),
+                )
+        except sqlite3.Error:
+            logger.exception("Lyrics cache write failed for %s - %s", title, artist)
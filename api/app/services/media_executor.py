@@ -0,0 +1,80 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, TypeVar
+
+from app.utils.logger import BusyError
+
+T = TypeVar("T")
+
+
+class MediaExecutor:
+    """
+    Bounded pool for yt-dlp downloads and ffmpeg transcodes, kept off the event loop.
+    - slot() admits at most `max_workers` jobs at once and queues up to `max_queue`
+      more; beyond that it raises BusyError instead of piling up work
+    - run() executes blocking code on the pool's threads; on cancellation it sets
+      the job's cancel event and waits for the thread to notice before returning
+    """
+
+    def __init__(self, max_workers: int = 0, max_queue: int = 16):
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self.max_queue = max_queue
+        self.queued = 0
+        self.running = 0
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="media"
+        )
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        if self._slots.locked() and self.queued >= self.max_queue:
+            raise BusyError(
+                f"Media queue is full ({self.running} running, {self.queued} queued)"
+            )
+
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._slots.release()
+
+    async def run(
+        self, fn: Callable[[threading.Event], T], cancel_grace_sec: float = 30.0
+    ) -> T:
+        cancel = threading.Event()
+        loop = asyncio.get_running_loop()
+        fut = loop.run_in_executor(self._pool, fn, cancel)
+        try:
+            return await asyncio.shield(fut)
+        except asyncio.CancelledError:
+            cancel.set()
+            await asyncio.wait([fut], timeout=cancel_grace_sec)
+            if fut.done() and not fut.cancelled():
+                fut.exception()  # retrieved so asyncio does not log it
+            raise
+
+    def has_capacity(self) -> bool:
+        """True when a new job would start right away instead of queueing"""
+        return self.running + self.queued < self.max_workers
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "maxWorkers": self.max_workers,
+            "maxQueue": self.max_queue,
+            "running": self.running,
+            "queued": self.queued,
+        }
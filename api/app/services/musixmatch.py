@@ -3,7 +3,6 @@ from typing import Any, Dict, Optional, Tuple
 from urllib.parse import urlencode, urljoin
 
 from crawl4ai import (
-    AsyncWebCrawler,
     BrowserConfig,
     CacheMode,
     CrawlerRunConfig,
@@ -13,15 +12,46 @@ from crawl4ai import (
 )
 
 from app.services.base import LyricsBaseProvider
-from app.utils.logger import NoResultsError, ProviderError
+from app.services.browser_pool import BrowserPool, lease_crawler
+from app.services.host_limiter import HostLimiter
+from app.services.page_cache import PageCache
+from app.utils.logger import BusyError, NoResultsError, ProviderError
 
 
-# TODO maybe refactor with an initialized AcynWebCrawler since it is used in two methods here
 class Musixmatch(LyricsBaseProvider):
     BASE_URL = "https://www.musixmatch.com"
 
-    def __init__(self, musixmatch_profile_path):
+    def __init__(
+        self,
+        musixmatch_profile_path,
+        crawler_pool: Optional[BrowserPool] = None,
+        profile_pool: Optional[BrowserPool] = None,
+        limiter: Optional[HostLimiter] = None,
+        page_cache: Optional[PageCache] = None,
+    ):
+        """
+        - crawler_pool serves plain page crawls (lyrics pages)
+        - profile_pool serves crawls that need the logged-in Musixmatch profile (search)
+        - limiter paces page loads against www.musixmatch.com across workers
+        - page_cache records search and lyrics pages as crawled (see PageCache)
+        """
         self.musixmatch_profile_path = musixmatch_profile_path
+        self.crawler_pool = crawler_pool
+        self.profile_pool = profile_pool
+        self.limiter = limiter
+        self.page_cache = page_cache
+
+    @staticmethod
+    def browser_config(musixmatch_profile_path: str) -> BrowserConfig:
+        return BrowserConfig(
+            headless=True,
+            verbose=True,
+            use_managed_browser=True,
+            use_persistent_context=True,
+            user_data_dir=musixmatch_profile_path,
+            browser_type="chromium",
+            text_mode=True,
+        )
 
     def _get_top_result(
         self, search_result: Dict[str, list]
@@ -126,19 +156,17 @@ class Musixmatch(LyricsBaseProvider):
             word_count_threshold=1,
         )
 
-        browser_config = BrowserConfig(
-            headless=True,
-            verbose=True,
-            use_managed_browser=True,
-            use_persistent_context=True,
-            user_data_dir=self.musixmatch_profile_path,
-            browser_type="chromium",
-            text_mode=True
-        )
+        browser_config = self.browser_config(self.musixmatch_profile_path)
 
         try:
-            async with AsyncWebCrawler(config=browser_config) as crawler:
-                res = await crawler.arun(search_query, config=crawler_config)
+            async with lease_crawler(self.profile_pool, browser_config) as crawler:
+                res = await self._crawl(
+                    crawler,
+                    search_query,
+                    crawler_config,
+                    "search",
+                    lambda: self._paced_arun(crawler, search_query, crawler_config),
+                )
 
                 if not res.success:  # type: ignore
                     print("Debug HTML snippet:\n", res.cleaned_html[:1000])  # type: ignore
@@ -187,6 +215,8 @@ class Musixmatch(LyricsBaseProvider):
 
                 return {"best_result": best_results, "tracks": tracks}
 
+        except BusyError:
+            raise
         except Exception as e:
             raise ProviderError(f"Error making search query: {str(e)}")
 
@@ -202,12 +232,12 @@ class Musixmatch(LyricsBaseProvider):
                 raise NoResultsError("No URL found for top result")
 
             return top_result["url"]
-        except (NoResultsError, ProviderError):
+        except (NoResultsError, ProviderError, BusyError):
             raise
         except Exception as e:
             raise ProviderError(f"Musixmatch client error: {str(e)}") from e
 
-    async def scrape_lyrics(self, url: str) -> Tuple[Optional[str], Optional[str]]:
+    def lyrics_run_config(self) -> CrawlerRunConfig:
         prune_filer = PruningContentFilter(
             threshold=0.5,
             threshold_type="fixed",
@@ -228,16 +258,28 @@ class Musixmatch(LyricsBaseProvider):
             remove_overlay_elements=True,
             word_count_threshold=1,
         )
+        return config
+
+    async def scrape_lyrics(self, url: str) -> Tuple[Optional[str], Optional[str]]:
+        config = self.lyrics_run_config()
 
         try:
-            async with AsyncWebCrawler() as crawler:
-                result = await crawler.arun(url, config=config)
+            async with lease_crawler(self.crawler_pool) as crawler:
+                result = await self._crawl(
+                    crawler,
+                    url,
+                    config,
+                    "browser",
+                    lambda: self._paced_arun(crawler, url, config),
+                )
 
             if not result.success:  # type: ignore
                 return None, str(result.error_message)  # type: ignore
 
             md = result.markdown  # type: ignore
             return md, None
+        except BusyError:
+            raise
         except Exception as e:
             return None, str(e)
 
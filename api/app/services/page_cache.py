@@ -0,0 +1,240 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterator, Optional
+
+from app.utils.logger import ProviderError, logger
+
+# write:   always fetch, record every page
+# replay:  serve recorded pages younger than max_age_sec, fetch and record the rest
+# offline: serve recorded pages of any age, never touch the network
+PAGE_CACHE_MODES = ("write", "replay", "offline")
+
+# Writes between full size recounts; other workers write to the same file
+RECOUNT_EVERY = 100
+
+
+@dataclass
+class CachedPage:
+    url: str
+    fetcher: str
+    content: str
+    content_type: str
+    fetched_at: float
+
+
+class PageCache:
+    """
+    Raw pages exactly as fetched, zlib-compressed in one SQLite file shared by
+    every worker on the host, so extraction and cleaning can be re-run offline.
+    - keyed by url + fetcher ("genius:static", "musixmatch:search", ...): a
+      page fetched statically and the same url rendered by a browser differ
+    - one row per key; a refetch replaces the stored page
+    - oldest fetches are evicted once the compressed pages exceed `max_bytes`;
+      the total is tracked per process and recounted every RECOUNT_EVERY writes
+    - put() compresses and writes synchronously; async callers (through())
+      run it in a thread
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = "write",
+        max_age_sec: int = 7 * 24 * 3600,
+        max_bytes: int = 1024**3,
+    ):
+        if mode not in PAGE_CACHE_MODES:
+            raise ValueError(f"Unknown page cache mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.max_age_sec = max_age_sec
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Approximate stored bytes, None until the first recount
+        self._total: Optional[int] = None
+        self._writes = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT NOT NULL,
+                fetcher TEXT NOT NULL,
+                content_type TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                raw_size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (url, fetcher)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS pages_fetched_at ON pages (fetched_at)"
+        )
+        self._conn.commit()
+
+    @property
+    def reads(self) -> bool:
+        return self.mode != "write"
+
+    @property
+    def offline(self) -> bool:
+        return self.mode == "offline"
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get(
+        self, url: str, fetcher: str, max_age_sec: Optional[float] = None
+    ) -> Optional[CachedPage]:
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT content_type, body, fetched_at FROM pages"
+                    " WHERE url = ? AND fetcher = ?",
+                    (url, fetcher),
+                ).fetchone()
+        except sqlite3.Error:
+            logger.exception("Page cache read failed for %s", url)
+            return None
+        if row is None:
+            return None
+        if max_age_sec is not None and row[2] < time.time() - max_age_sec:
+            return None
+        return CachedPage(
+            url=url,
+            fetcher=fetcher,
+            content=zlib.decompress(row[1]).decode("utf-8"),
+            content_type=row[0],
+            fetched_at=row[2],
+        )
+
+    def lookup(self, url: str, fetcher: str) -> Optional[CachedPage]:
+        """Page to serve instead of fetching, per the cache mode"""
+        if not self.reads:
+            return None
+        return self.get(url, fetcher, None if self.offline else self.max_age_sec)
+
+    def put(
+        self, url: str, fetcher: str, content: str, content_type: str = "html"
+    ) -> None:
+        raw = content.encode("utf-8")
+        body = zlib.compress(raw, 6)
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO pages"
+                    " (url, fetcher, content_type, body, size, raw_size, fetched_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        url,
+                        fetcher,
+                        content_type,
+                        body,
+                        len(body),
+                        len(raw),
+                        time.time(),
+                    ),
+                )
+                self._writes += 1
+                if (
+                    self._total is None
+                    or self._writes % RECOUNT_EVERY == 0
+                    or self._total + len(body) > self.max_bytes
+                ):
+                    self._total = self._evict()
+                else:
+                    self._total += len(body)
+        except sqlite3.Error:
+            logger.exception("Page cache write failed for %s", url)
+
+    async def through(
+        self,
+        url: str,
+        fetcher: str,
+        fetch: Callable[[], Awaitable[Optional[str]]],
+        content_type: str = "html",
+    ) -> Optional[str]:
+        """Serve `url` from the cache per the mode, otherwise fetch() and record it"""
+        page = (
+            await asyncio.to_thread(self.lookup, url, fetcher) if self.reads else None
+        )
+        if page:
+            return page.content
+        if self.offline:
+            raise ProviderError(f"Offline: {fetcher} page not cached for {url}")
+
+        content = await fetch()
+        if content:
+            await asyncio.to_thread(self.put, url, fetcher, content, content_type)
+        return content
+
+    def pages(self, fetcher_prefix: str = "", batch: int = 200) -> Iterator[CachedPage]:
+        """Every stored page whose fetcher starts with `fetcher_prefix`, oldest first"""
+        last = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, url, fetcher, content_type, body, fetched_at"
+                    " FROM pages WHERE rowid > ? AND fetcher LIKE ? || '%'"
+                    " ORDER BY rowid LIMIT ?",
+                    (last, fetcher_prefix, batch),
+                ).fetchall()
+            if not rows:
+                return
+            for rowid, url, fetcher, content_type, body, fetched_at in rows:
+                last = rowid
+                yield CachedPage(
+                    url=url,
+                    fetcher=fetcher,
+                    content=zlib.decompress(body).decode("utf-8"),
+                    content_type=content_type,
+                    fetched_at=fetched_at,
+                )
+
+    def stats(self) -> dict:
+        try:
+            with self._lock:
+                entries, size, raw_size = self._conn.execute(
+                    "SELECT count(*), coalesce(sum(size), 0),"
+                    " coalesce(sum(raw_size), 0) FROM pages"
+                ).fetchone()
+        except sqlite3.Error:
+            logger.exception("Page cache stats failed")
+            return {}
+        return {
+            "mode": self.mode,
+            "entries": entries,
+            "bytes": size,
+            "rawBytes": raw_size,
+            "maxBytes": self.max_bytes,
+        }
+
+    def _evict(self) -> int:
+        """Drop the oldest fetches until the rest fit; returns the bytes left (lock held)"""
+        (total,) = self._conn.execute(
+            "SELECT coalesce(sum(size), 0) FROM pages"
+        ).fetchone()
+        while total > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT url, fetcher, size FROM pages ORDER BY fetched_at ASC LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return 0
+            self._conn.execute(
+                "DELETE FROM pages WHERE url = ? AND fetcher = ?", (row[0], row[1])
+            )
+            total -= row[2]
+        return total
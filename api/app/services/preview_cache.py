@@ -0,0 +1,271 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+from app.utils.logger import logger
+
+
+@dataclass
+class CachedPreview:
+    digest: str
+    path: str
+    size: int
+    source_url: str
+    bitrate_kbps: int
+    duration_sec: float
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.digest}"'
+
+
+def preview_key(video_id: str, start_sec: float, len_sec: float, bitrate: int) -> str:
+    return f"{video_id}:{start_sec:.3f}:{len_sec:.3f}:{bitrate}"
+
+
+class PreviewWriter:
+    """
+    Collects a preview as it is produced and hashes it on the way.
+    - commit() moves the file into the cache under its content digest
+    - discard() drops a partial file (client left, ffmpeg failed)
+    """
+
+    def __init__(self, cache: "PreviewCache"):
+        self._cache = cache
+        self._hash = hashlib.sha256()
+        self._size = 0
+        self._tmp = os.path.join(cache.tmp_dir, f"{uuid.uuid4().hex}.part")
+        self._file = open(self._tmp, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+        self._hash.update(chunk)
+        self._size += len(chunk)
+
+    def commit(
+        self, key: str, source_url: str, bitrate_kbps: int, duration_sec: float
+    ) -> Optional[CachedPreview]:
+        self._file.close()
+        if self._size == 0:
+            self.discard()
+            return None
+        return self._cache._store(
+            key,
+            self._tmp,
+            self._hash.hexdigest(),
+            self._size,
+            source_url,
+            bitrate_kbps,
+            duration_sec,
+        )
+
+    def discard(self) -> None:
+        self._file.close()
+        try:
+            os.remove(self._tmp)
+        except FileNotFoundError:
+            pass
+
+
+class PreviewCache:
+    """
+    On-disk cache of generated previews, shared by every worker on the host.
+    - files are stored by the sha256 of their bytes, which doubles as the ETag;
+      identical cuts requested under different keys share one file
+    - keys are videoId + start + length + bitrate (see preview_key)
+    - least recently read entries are evicted once the files exceed `max_bytes`
+    """
+
+    def __init__(self, root: str, max_bytes: int = 2 * 1024**3):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.blob_dir = os.path.join(root, "blobs")
+        self.tmp_dir = os.path.join(root, "tmp")
+        self._lock = threading.Lock()
+
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+        self._conn = sqlite3.connect(
+            os.path.join(root, "index.sqlite3"), check_same_thread=False, timeout=5.0
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS previews (
+                key TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                source_url TEXT NOT NULL,
+                bitrate_kbps INTEGER NOT NULL,
+                duration_sec REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS previews_accessed_at ON previews (accessed_at)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS previews_digest ON previews (digest)"
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest[:2], f"{digest}.m4a")
+
+    def get(self, key: str) -> Optional[CachedPreview]:
+        return self._lookup("key", key)
+
+    def get_blob(self, digest: str) -> Optional[CachedPreview]:
+        return self._lookup("digest", digest)
+
+    def writer(self) -> PreviewWriter:
+        return PreviewWriter(self)
+
+    def put(
+        self,
+        key: str,
+        data: bytes,
+        source_url: str,
+        bitrate_kbps: int,
+        duration_sec: float,
+    ) -> Optional[CachedPreview]:
+        writer = self.writer()
+        writer.write(data)
+        return writer.commit(key, source_url, bitrate_kbps, duration_sec)
+
+    def stats(self) -> dict:
+        try:
+            with self._lock:
+                entries, files, size = self._conn.execute(
+                    "SELECT count(*), count(DISTINCT digest),"
+                    " (SELECT coalesce(sum(size), 0) FROM"
+                    "  (SELECT max(size) AS size FROM previews GROUP BY digest))"
+                    " FROM previews"
+                ).fetchone()
+        except sqlite3.Error:
+            logger.exception("Preview cache stats failed")
+            return {}
+        return {
+            "entries": entries,
+            "files": files,
+            "bytes": size,
+            "maxBytes": self.max_bytes,
+        }
+
+    def _lookup(self, column: str, value: str) -> Optional[CachedPreview]:
+        try:
+            with self._lock, self._conn:
+                row = self._conn.execute(
+                    "SELECT key, digest, size, source_url, bitrate_kbps, duration_sec"
+                    f" FROM previews WHERE {column} = ? LIMIT 1",
+                    (value,),
+                ).fetchone()
+                if row is None:
+                    return None
+
+                path = self.blob_path(row[1])
+                if not os.path.exists(path):
+                    self._conn.execute(
+                        "DELETE FROM previews WHERE digest = ?", (row[1],)
+                    )
+                    return None
+
+                self._conn.execute(
+                    "UPDATE previews SET accessed_at = ? WHERE key = ?",
+                    (time.time(), row[0]),
+                )
+                return CachedPreview(
+                    digest=row[1],
+                    path=path,
+                    size=row[2],
+                    source_url=row[3],
+                    bitrate_kbps=row[4],
+                    duration_sec=row[5],
+                )
+        except sqlite3.Error:
+            logger.exception("Preview cache read failed for %s", value)
+            return None
+
+    def _store(
+        self,
+        key: str,
+        tmp: str,
+        digest: str,
+        size: int,
+        source_url: str,
+        bitrate_kbps: int,
+        duration_sec: float,
+    ) -> Optional[CachedPreview]:
+        path = self.blob_path(digest)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp, path)
+
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO previews"
+                    " (key, digest, size, source_url, bitrate_kbps, duration_sec,"
+                    "  accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        digest,
+                        size,
+                        source_url,
+                        bitrate_kbps,
+                        duration_sec,
+                        time.time(),
+                    ),
+                )
+                self._evict()
+        except (OSError, sqlite3.Error):
+            logger.exception("Preview cache write failed for %s", key)
+            return None
+
+        return CachedPreview(
+            digest=digest,
+            path=path,
+            size=size,
+            source_url=source_url,
+            bitrate_kbps=bitrate_kbps,
+            duration_sec=duration_sec,
+        )
+
+    def _evict(self) -> None:
+        """Drop least recently read keys until the unique files fit (lock held)"""
+        (total,) = self._conn.execute(
+            "SELECT coalesce(sum(size), 0) FROM"
+            " (SELECT max(size) AS size FROM previews GROUP BY digest)"
+        ).fetchone()
+
+        while total > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT key, digest, size FROM previews"
+                " ORDER BY accessed_at ASC LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return
+            key, digest, size = row
+            self._conn.execute("DELETE FROM previews WHERE key = ?", (key,))
+
+            (shared,) = self._conn.execute(
+                "SELECT count(*) FROM previews WHERE digest = ?", (digest,)
+            ).fetchone()
+            if shared == 0:
+                try:
+                    os.remove(self.blob_path(digest))
+                except FileNotFoundError:
+                    pass
+                total -= size
@@ -0,0 +1,308 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import orjson
+
+from app.utils.logger import BusyError, logger
+
+
+@dataclass
+class JobRecord:
+    id: str
+    track_id: str
+    status: str
+    error: Optional[str] = None
+    result_path: Optional[str] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+class PreviewJobStore:
+    """
+    SQLite-backed queue of preview jobs, shared by every worker on the host.
+    - any worker may claim a queued job, so a job can be polled on one worker
+      and produced on another
+    - finished previews are written next to the index until fetched or expired:
+      jobs live for `ttl_sec`, and for `fetched_ttl_sec` once their result is read
+    - running jobs are heartbeaten by their worker; one without a heartbeat for
+      `stale_sec` (worker died mid-job) is queued again
+    """
+
+    def __init__(
+        self,
+        root: str,
+        ttl_sec: int = 3600,
+        fetched_ttl_sec: int = 300,
+        stale_sec: int = 600,
+        max_pending: int = 500,
+    ):
+        self.root = root
+        self.ttl_sec = ttl_sec
+        self.fetched_ttl_sec = fetched_ttl_sec
+        self.stale_sec = stale_sec
+        self.max_pending = max_pending
+        self.result_dir = os.path.join(root, "results")
+        self._lock = threading.Lock()
+
+        os.makedirs(self.result_dir, exist_ok=True)
+
+        self._conn = sqlite3.connect(
+            os.path.join(root, "jobs.sqlite3"), check_same_thread=False, timeout=5.0
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                track_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                result_path TEXT,
+                headers TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)"
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def submit(self, track_id: str, payload: str) -> JobRecord:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._conn:
+            (pending,) = self._conn.execute(
+                "SELECT count(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()
+            if pending >= self.max_pending:
+                raise BusyError(f"Preview job queue is full ({pending} pending)")
+
+            self._conn.execute(
+                "INSERT INTO jobs (id, track_id, payload, status, created_at, expires_at)"
+                " VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, track_id, payload, now, now + self.ttl_sec),
+            )
+        return JobRecord(id=job_id, track_id=track_id, status="queued")
+
+    def get(self, job_id: str) -> Optional[JobRecord]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT track_id, status, error, result_path, headers FROM jobs"
+                " WHERE id = ? AND expires_at > ?",
+                (job_id, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        return JobRecord(
+            id=job_id,
+            track_id=row[0],
+            status=row[1],
+            error=row[2],
+            result_path=row[3],
+            headers=orjson.loads(row[4]) if row[4] else {},
+        )
+
+    def claim(self) -> Optional[Tuple[str, str]]:
+        """Take the oldest queued job; returns (job id, payload)"""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?"
+                " WHERE id = (SELECT id FROM jobs WHERE status = 'queued'"
+                "  ORDER BY created_at LIMIT 1)"
+                " AND status = 'queued'"
+                " RETURNING id, payload",
+                (time.time(),),
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def heartbeat(self, job_id: str) -> None:
+        """Mark a running job as still being worked on (see sweep)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET started_at = ? WHERE id = ? AND status = 'running'",
+                (time.time(), job_id),
+            )
+
+    def requeue(self, job_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL WHERE id = ?",
+                (job_id,),
+            )
+
+    def finish(self, job_id: str, data: bytes, headers: Dict[str, str]) -> None:
+        path = os.path.join(self.result_dir, f"{job_id}.m4a")
+        tmp = f"{path}.part"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'done', result_path = ?, headers = ?"
+                " WHERE id = ?",
+                (path, orjson.dumps(headers).decode(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ? WHERE id = ?",
+                (error, job_id),
+            )
+
+    def mark_fetched(self, job_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET expires_at = min(expires_at, ?) WHERE id = ?",
+                (time.time() + self.fetched_ttl_sec, job_id),
+            )
+
+    def sweep(self) -> int:
+        """Drop expired jobs with their results and requeue stale running ones"""
+        now = time.time()
+        with self._lock, self._conn:
+            expired: List[Any] = self._conn.execute(
+                "DELETE FROM jobs WHERE expires_at <= ? RETURNING result_path", (now,)
+            ).fetchall()
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL"
+                " WHERE status = 'running' AND started_at <= ?",
+                (now - self.stale_sec,),
+            )
+
+        for (path,) in expired:
+            if path:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        return len(expired)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, count(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        return {status: count for status, count in rows}
+
+
+class PreviewJobRunner:
+    """
+    Per-worker pool of `workers` coroutines that claim and run queued preview jobs.
+    - `run(payload)` produces (audio bytes, response headers) for one job
+    - BusyError from the media executor puts the job back in the queue
+    - notify() wakes idle workers right after a local submit; jobs submitted on
+      other workers are picked up on the next poll
+    - a running job is heartbeaten every third of the store's `stale_sec`, so a
+      slow job is never mistaken for one whose worker died
+    - queue errors (e.g. the database locked by another worker) are logged and
+      retried on the next poll instead of stopping the worker
+    - store calls run in threads, so waiting on the database lock (or writing a
+      result file) does not stall the worker's event loop
+    """
+
+    def __init__(
+        self,
+        store: PreviewJobStore,
+        run: Callable[[str], Awaitable[Tuple[bytes, Dict[str, str]]]],
+        workers: int = 2,
+        poll_sec: float = 1.0,
+        sweep_sec: float = 60.0,
+    ):
+        self.store = store
+        self.workers = workers
+        self.poll_sec = poll_sec
+        self.sweep_sec = sweep_sec
+        self.active = 0
+        self._run = run
+        self._wake = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.ensure_future(self._worker()) for _ in range(self.workers)
+        ]
+        self._tasks.append(asyncio.ensure_future(self._sweeper()))
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "active": self.active, **self.store.stats()}
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                claimed = await asyncio.to_thread(self.store.claim)
+                if claimed is None:
+                    self._wake.clear()
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), timeout=self.poll_sec)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                await self._run_job(*claimed)
+            except sqlite3.Error:
+                logger.exception("Preview job queue unavailable, retrying")
+                await asyncio.sleep(self.poll_sec)
+
+    async def _run_job(self, job_id: str, payload: str) -> None:
+        self.active += 1
+        heartbeat = asyncio.ensure_future(self._heartbeat(job_id))
+        try:
+            data, headers = await self._run(payload)
+            await asyncio.to_thread(self.store.finish, job_id, data, headers)
+        except asyncio.CancelledError:
+            await asyncio.to_thread(self.store.requeue, job_id)
+            raise
+        except BusyError:
+            await asyncio.to_thread(self.store.requeue, job_id)
+            await asyncio.sleep(self.poll_sec)
+        except Exception as e:
+            logger.warning("Preview job %s failed: %s", job_id, str(e))
+            await asyncio.to_thread(
+                self.store.fail, job_id, str(getattr(e, "detail", None) or e)
+            )
+        finally:
+            heartbeat.cancel()
+            self.active -= 1
+
+    async def _heartbeat(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.store.stale_sec / 3)
+            try:
+                await asyncio.to_thread(self.store.heartbeat, job_id)
+            except sqlite3.Error:
+                logger.exception("Preview job %s heartbeat failed", job_id)
+
+    async def _sweeper(self) -> None:
+        while True:
+            try:
+                removed = await asyncio.to_thread(self.store.sweep)
+                if removed:
+                    logger.info("Preview jobs: expired %d", removed)
+            except sqlite3.Error:
+                logger.exception("Preview job sweep failed")
+            await asyncio.sleep(self.sweep_sec)
@@ -0,0 +1,179 @@
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from app.utils.logger import logger
+
+
+@dataclass
+class CachedSource:
+    video_id: str
+    format_id: str
+    path: str
+    size: int
+    acodec: Optional[str]
+    abr: Optional[float]
+
+
+class SourceAudioCache:
+    """
+    Full best-audio downloads kept on disk so new cuts of a video stay local.
+    - keyed by videoId + yt-dlp format id; get() returns the most recently used
+      format of a video
+    - least recently read files are evicted once they exceed `max_bytes`
+    """
+
+    def __init__(self, root: str, max_bytes: int = 5 * 1024**3):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.tmp_dir = os.path.join(root, "tmp")
+        self._lock = threading.Lock()
+
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+        self._conn = sqlite3.connect(
+            os.path.join(root, "index.sqlite3"), check_same_thread=False, timeout=5.0
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sources (
+                video_id TEXT NOT NULL,
+                format_id TEXT NOT NULL,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                acodec TEXT,
+                abr REAL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (video_id, format_id)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS sources_accessed_at ON sources (accessed_at)"
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get(self, video_id: str) -> Optional[CachedSource]:
+        try:
+            with self._lock, self._conn:
+                row = self._conn.execute(
+                    "SELECT format_id, path, size, acodec, abr FROM sources"
+                    " WHERE video_id = ? ORDER BY accessed_at DESC LIMIT 1",
+                    (video_id,),
+                ).fetchone()
+                if row is None:
+                    return None
+
+                if not os.path.exists(row[1]):
+                    self._conn.execute(
+                        "DELETE FROM sources WHERE video_id = ? AND format_id = ?",
+                        (video_id, row[0]),
+                    )
+                    return None
+
+                self._conn.execute(
+                    "UPDATE sources SET accessed_at = ?"
+                    " WHERE video_id = ? AND format_id = ?",
+                    (time.time(), video_id, row[0]),
+                )
+                return CachedSource(
+                    video_id=video_id,
+                    format_id=row[0],
+                    path=row[1],
+                    size=row[2],
+                    acodec=row[3],
+                    abr=row[4],
+                )
+        except sqlite3.Error:
+            logger.exception("Source cache read failed for %s", video_id)
+            return None
+
+    def put(
+        self, video_id: str, src: str, fmt: Dict[str, Any]
+    ) -> Optional[CachedSource]:
+        """Move a downloaded file into the cache; `fmt` is what download_audio returned"""
+        format_id = str(fmt.get("format_id") or "best")
+        ext = fmt.get("ext") or os.path.splitext(src)[1].lstrip(".") or "bin"
+        safe_id = "".join(
+            c for c in f"{video_id}.{format_id}" if c.isalnum() or c in "-_."
+        )
+        path = os.path.join(self.root, f"{safe_id}.{ext}")
+
+        try:
+            size = os.path.getsize(src)
+            if size > self.max_bytes:
+                return None
+            os.replace(src, path)
+
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sources"
+                    " (video_id, format_id, path, size, acodec, abr, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        video_id,
+                        format_id,
+                        path,
+                        size,
+                        fmt.get("acodec"),
+                        fmt.get("abr"),
+                        time.time(),
+                    ),
+                )
+                self._evict()
+        except (OSError, sqlite3.Error):
+            logger.exception("Source cache write failed for %s", video_id)
+            return None
+
+        return CachedSource(
+            video_id=video_id,
+            format_id=format_id,
+            path=path,
+            size=size,
+            acodec=fmt.get("acodec"),
+            abr=fmt.get("abr"),
+        )
+
+    def stats(self) -> dict:
+        try:
+            with self._lock:
+                entries, size = self._conn.execute(
+                    "SELECT count(*), coalesce(sum(size), 0) FROM sources"
+                ).fetchone()
+        except sqlite3.Error:
+            logger.exception("Source cache stats failed")
+            return {}
+        return {"entries": entries, "bytes": size, "maxBytes": self.max_bytes}
+
+    def _evict(self) -> None:
+        """Drop least recently read files until the rest fit (lock held)"""
+        (total,) = self._conn.execute(
+            "SELECT coalesce(sum(size), 0) FROM sources"
+        ).fetchone()
+
+        while total > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT video_id, format_id, path, size FROM sources"
+                " ORDER BY accessed_at ASC LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return
+            video_id, format_id, path, size = row
+            self._conn.execute(
+                "DELETE FROM sources WHERE video_id = ? AND format_id = ?",
+                (video_id, format_id),
+            )
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
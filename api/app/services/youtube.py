@@ -1,34 +1,173 @@
+import asyncio
+import importlib.util
 import json
+import os
 import re
 import shutil
-import subprocess
+import threading
 import urllib.parse
-from typing import Any, Dict, List, Optional
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Tuple
 
-import requests
+import httpx
 from dotenv import load_dotenv
+from yt_dlp import YoutubeDL
+from yt_dlp.utils import DownloadCancelled, download_range_func
 
-from app.utils.logger import NoResultsError, ProviderError
+from app.services.candidate_scoring import parse_view_count, rank_candidates
+from app.services.host_limiter import HostLimiter, Lease, LimitedTransport
+from app.services.page_cache import PageCache
+from app.services.yt_initial_data import extract_yt_initial_data
+from app.utils.logger import NoResultsError, ProviderError, logger
+from app.utils.text import title_key
 
 load_dotenv()
 
 
 FFMPEG = shutil.which("ffmpeg") or "/usr/bin/ffmpeg"
 
+SEARCH_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Accept-Language": "en",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+}
+
+
+# YouTube search filter: playlists only
+PLAYLIST_FILTER = "EgIQAw%3D%3D"
+
+# Client identity sent with InnerTube (youtubei/v1) JSON requests; the web
+# client version goes stale, so it can be overridden per scraper
+INNERTUBE_CLIENT = {"clientName": "WEB", "hl": "en", "gl": "US"}
+INNERTUBE_CLIENT_VERSION = "2.20250923.01.00"
+
+
+# yt-dlp errors about one video (private, removed, geo/age/member locked),
+# not about YouTube failing us
+UNAVAILABLE_PATTERN = re.compile(
+    r"private video|video unavailable|been removed|no longer available"
+    r"|not available in your country|geo.?restrict|members.?only|premium members"
+    r"|confirm your age|age.?restrict|copyright claim|account .* terminated",
+    re.I,
+)
+
+
+def video_unavailable(e: BaseException) -> bool:
+    return bool(UNAVAILABLE_PATTERN.search(str(e)))
+
+
+FEAT_PATTERN = re.compile(
+    r"\s*[\(\[]?\s*\b(?:feat\.?|ft\.|featuring)\s[^\)\]]*[\)\]]?", re.I
+)
+
+
+def query_variants(title: str, artist: str) -> List[str]:
+    """Search queries for one track, the original search_scrape query first"""
+    stripped = FEAT_PATTERN.sub("", title).strip() or title
+    variants = [
+        f"'{title}' {artist}",
+        f"{stripped} {artist}",
+        f"{stripped} {artist} official audio",
+        f"{artist} - Topic {stripped}",
+        f"'{stripped}' {artist}",
+    ]
+    return list(dict.fromkeys(variants))
+
+
+def can_stream_copy(
+    acodec: Optional[str], abr: Optional[float], bitrate_kbps: int
+) -> bool:
+    """AAC sources at or below the requested bitrate can be cut without re-encoding"""
+    if not acodec or not acodec.startswith(("mp4a", "aac")):
+        return False
+    return bool(abr) and abr <= bitrate_kbps * 1.05
+
+
+def _audio_codec_args(copy: bool, bitrate_kbps: int) -> List[str]:
+    if copy:
+        return ["-c:a", "copy"]
+    return ["-c:a", "aac", "-b:a", f"{bitrate_kbps}k"]
+
+
+async def _stderr_tail(stream: asyncio.StreamReader, keep: int = 4096) -> bytes:
+    """Read a subprocess pipe to EOF so it can never fill up; returns its last bytes"""
+    tail = b""
+    while True:
+        chunk = await stream.read(65536)
+        if not chunk:
+            return tail
+        tail = (tail + chunk)[-keep:]
+
+
+def make_youtube_client(
+    max_connections: int = 20,
+    max_keepalive_connections: int = 10,
+    limiter: Optional[HostLimiter] = None,
+) -> httpx.AsyncClient:
+    """
+    Keep-alive client for www.youtube.com, meant to live as long as the app.
+    - the pool only ever talks to YouTube, so its limits are the per-host limits
+    - HTTP/2 is negotiated when the h2 package is installed
+    - `limiter` paces requests across workers (see HostLimiter)
+    """
+    transport: httpx.AsyncBaseTransport = httpx.AsyncHTTPTransport(
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=60.0,
+        ),
+    )
+    if limiter:
+        transport = LimitedTransport(transport, limiter)
+    return httpx.AsyncClient(
+        transport=transport,
+        headers=SEARCH_HEADERS,
+        timeout=httpx.Timeout(10.0, connect=5.0),
+        follow_redirects=True,
+    )
+
 
 class YoutubeScraper:
     """Manual YouTube scraping implementation based on the Go code approach"""
 
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update(
-            {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-                "Accept-Language": "en",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            }
-        )
+    def __init__(
+        self,
+        client: Optional[httpx.AsyncClient] = None,
+        search_backend: str = "html",
+        base_url: str = "https://www.youtube.com",
+        innertube_client_version: str = INNERTUBE_CLIENT_VERSION,
+        innertube_pages: int = 1,
+        limiter: Optional[HostLimiter] = None,
+        page_cache: Optional[PageCache] = None,
+    ):
+        self._owns_client = client is None
+        self.client = client or make_youtube_client(limiter=limiter)
+        # Paces the yt-dlp work callers run for this scraper (see upstream())
+        self.limiter = limiter
+        # Raw search/playlist pages and InnerTube responses (see _fetch_text)
+        self.page_cache = page_cache
         self.duration_match_threshold = 5
+        # "html" or "innertube" (JSON API, HTML page as fallback)
+        self.search_backend = search_backend
+        self.innertube_client_version = innertube_client_version
+        # InnerTube result pages per query: the first plus continuations
+        self.innertube_pages = innertube_pages
+        self.base_url = base_url.rstrip("/")
+
+    async def aclose(self) -> None:
+        if self._owns_client:
+            await self.client.aclose()
+
+    def upstream(self, host: str):
+        """
+        Async context holding a limiter slot on `host` around work the client
+        does not see: yt-dlp extraction (www.youtube.com) and media reads
+        ("googlevideo")
+        """
+        if self.limiter is None:
+            return nullcontext(Lease())
+        return self.limiter.slot(host)
 
     def _parse_duration_string(self, duration_str: str) -> int:
         """Convert duration string like '3:45' to seconds"""
@@ -55,23 +194,7 @@ class YoutubeScraper:
 
     def _extract_yt_initial_data(self, html_content: str) -> Optional[Dict[Any, Any]]:
         """Extract ytInitialData JSON from YouTube search page HTML"""
-        patterns = [
-            r'window\["ytInitialData"\]\s*=\s*({.+?});',
-            r"var ytInitialData\s*=\s*({.+?});",
-            r'ytInitialData"\s*:\s*({.+?}),',
-            r"ytInitialData\s*=\s*({.+?});",
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, html_content, re.DOTALL)
-            if match:
-                try:
-                    json_str = match.group(1)
-                    return json.loads(json_str)
-                except json.JSONDecodeError:
-                    continue
-
-        return None
+        return extract_yt_initial_data(html_content)
 
     def _parse_search_results(
         self, yt_data: Dict[Any, Any], limit: int = 10
@@ -120,10 +243,25 @@ class YoutubeScraper:
 
                     duration_seconds = self._parse_duration_string(duration_text)
 
+                    # Extract view count and the verified artist badge for ranking
+                    view_text = video_renderer.get("viewCountText", {}).get(
+                        "simpleText"
+                    ) or video_renderer.get("shortViewCountText", {}).get(
+                        "simpleText", ""
+                    )
+                    badges = video_renderer.get("ownerBadges", [])
+                    verified_artist = any(
+                        badge.get("metadataBadgeRenderer", {}).get("style")
+                        == "BADGE_STYLE_TYPE_VERIFIED_ARTIST"
+                        for badge in badges
+                    )
+
                     result = {
                         "videoId": video_id,
                         "title": title,
                         "uploader": uploader,
+                        "views": parse_view_count(view_text),
+                        "verifiedArtist": verified_artist,
                         "duration": duration_text,
                         "durationSec": duration_seconds,
                         "url": f"https://youtube.com/watch?v={video_id}",
@@ -142,62 +280,595 @@ class YoutubeScraper:
         return results
 
     async def search_scrape(
-        self, title: str, artist: str, duration_sec: int, limit: int = 25
+        self,
+        title: str,
+        artist: str,
+        duration_sec: int,
+        limit: int = 25,
     ) -> List[Dict[str, Any]]:
-        """Search YouTube using manual scraping approach"""
+        """
+        Search YouTube using manual scraping approach
+        - with the innertube backend, `innertube_pages` > 1 follows
+          continuations for more candidates
+        - duration-matched results come back best scored first (see rank_candidates)
+        """
         search_query = f"'{title}' {artist}"
-        encoded_query = urllib.parse.quote(search_query)
-        search_url = f"https://www.youtube.com/results?search_query={encoded_query}"
 
         try:
-            response = self.session.get(search_url, timeout=10)
-            response.raise_for_status()
-
-            yt_data = self._extract_yt_initial_data(response.text)
-            if not yt_data:
-                raise ProviderError(
-                    "Could not extract YouTube initial data from search page"
-                )
-
-            search_results = self._parse_search_results(yt_data, limit)
+            search_results = await self._search_results(search_query, limit)
 
             if not search_results:
                 raise NoResultsError(f"No search results found for: {search_query}")
 
-            allowed_duration_start = duration_sec - self.duration_match_threshold
-            allowed_duration_end = duration_sec + self.duration_match_threshold
-
-            filtered_results = []
-            for result in search_results:
-                result_duration = result["durationSec"]
-                if allowed_duration_start <= result_duration <= allowed_duration_end:
-                    filtered_results.append(
-                        {
-                            "videoId": result["videoId"],
-                            "title": result["title"],
-                            "durationSec": result_duration,
-                            "url": result["url"],
-                            "category": "10",  # Default music category
-                        }
-                    )
+            filtered_results = self._duration_filter(search_results, duration_sec)
 
             if not filtered_results:
                 raise NoResultsError(
                     f"No duration-matched results found for: {search_query}"
                 )
 
-            filtered_results.sort(key=lambda x: abs(x["durationSec"] - duration_sec))
-
-            return filtered_results[:5]
+            ranked = rank_candidates(
+                filtered_results,
+                title,
+                artist,
+                duration_sec,
+                self.duration_match_threshold,
+            )
+            return self._public(ranked[:5])
 
-        except requests.RequestException as e:
+        except (NoResultsError, ProviderError):
+            raise
+        except httpx.HTTPError as e:
             raise ProviderError(f"YouTube scraping request failed: {str(e)}") from e
         except Exception as e:
             raise ProviderError(f"YouTube scraping error: {str(e)}") from e
 
-    def cut_to_m4a(
-        self, src: str, dst: str, start: float, dur: float, bitrate_kbps: int
+    def _duration_filter(
+        self, results: List[Dict[str, Any]], duration_sec: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Keep results within ±duration_match_threshold of the track
+        - uploader, views and verifiedArtist are carried along for rank_candidates
+        """
+        allowed_duration_start = duration_sec - self.duration_match_threshold
+        allowed_duration_end = duration_sec + self.duration_match_threshold
+
+        filtered_results = []
+        for result in results:
+            result_duration = result["durationSec"]
+            if allowed_duration_start <= result_duration <= allowed_duration_end:
+                filtered_results.append(
+                    {
+                        "videoId": result["videoId"],
+                        "title": result["title"],
+                        "durationSec": result_duration,
+                        "url": result["url"],
+                        "category": "10",  # Default music category
+                        "uploader": result.get("uploader", ""),
+                        "views": result.get("views", 0),
+                        "verifiedArtist": result.get("verifiedArtist", False),
+                    }
+                )
+        return filtered_results
+
+    def _public(self, ranked: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop the ranking-only fields from results returned to callers"""
+        return [
+            {
+                "videoId": r["videoId"],
+                "title": r["title"],
+                "durationSec": r["durationSec"],
+                "url": r["url"],
+                "category": r["category"],
+                "score": r.get("score"),
+            }
+            for r in ranked
+        ]
+
+    async def search_match(
+        self,
+        title: str,
+        artist: str,
+        duration_sec: int,
+        enough: int = 3,
+        max_parallel: int = 4,
+        limit: int = 25,
+        hedge_delay: float = 2.0,
+    ) -> List[Dict[str, Any]]:
+        """
+        Search with the original query and fan out to the other variants (see
+        query_variants) only when it has no duration match, fails, or is still
+        running after `hedge_delay` seconds; results come back merged and best
+        scored first (see rank_candidates).
+        - a fan-out stops as soon as `enough` distinct videos matched and
+          cancels the rest
+        - raises NoResultsError only when every variant came back without a match
+        """
+        queries = query_variants(title, artist)
+        slots = asyncio.Semaphore(max_parallel)
+
+        async def run(query: str) -> List[Dict[str, Any]]:
+            async with slots:
+                return await self._search_results(query, limit)
+
+        tasks = [asyncio.ensure_future(run(queries[0]))]
+        matched: Dict[str, Dict[str, Any]] = {}
+        errors: List[Exception] = []
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if done:
+                try:
+                    for result in self._duration_filter(
+                        tasks[0].result(), duration_sec
+                    ):
+                        matched.setdefault(result["videoId"], result)
+                except ProviderError as e:
+                    errors.append(e)
+            if not matched:
+                tasks += [asyncio.ensure_future(run(q)) for q in queries[1:]]
+            for next_done in asyncio.as_completed([t for t in tasks if t not in done]):
+                try:
+                    results = await next_done
+                except ProviderError as e:
+                    errors.append(e)
+                    continue
+                for result in self._duration_filter(results, duration_sec):
+                    matched.setdefault(result["videoId"], result)
+                if len(matched) >= enough:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+                # Retrieve late failures so asyncio does not log them
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+        if not matched:
+            if len(errors) == len(tasks):
+                raise errors[-1]
+            raise NoResultsError(
+                f"No duration-matched results found for: {title} - {artist}"
+            )
+
+        logger.info(
+            "Query fan-out for %s - %s: %d matches from %d/%d variants",
+            title,
+            artist,
+            len(matched),
+            sum(1 for t in tasks if t.done() and not t.cancelled()),
+            len(tasks),
+        )
+        ranked = rank_candidates(
+            list(matched.values()),
+            title,
+            artist,
+            duration_sec,
+            self.duration_match_threshold,
+        )
+        return self._public(ranked[:5])
+
+    async def _search_results(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        if self.search_backend == "innertube":
+            try:
+                results = await self.search_innertube(
+                    query, limit, max_pages=self.innertube_pages
+                )
+                if results:
+                    return results
+                logger.warning("InnerTube search found no videos, using results page")
+            except ProviderError as e:
+                logger.warning("InnerTube search failed, using results page: %s", e)
+
+        encoded_query = urllib.parse.quote(query)
+        yt_data = await self._initial_data(
+            f"{self.base_url}/results?search_query={encoded_query}"
+        )
+        return self._parse_search_results(yt_data, limit)
+
+    async def _fetch_text(
+        self,
+        url: str,
+        fetcher: str,
+        body: Optional[Dict[str, Any]] = None,
+        content_type: str = "html",
+    ) -> str:
+        """
+        GET `url` (POST `body` as JSON when given) through the page cache
+        - POSTs are cached under the url plus their sorted JSON body
+        """
+
+        async def fetch() -> str:
+            if body is None:
+                response = await self.client.get(url)
+            else:
+                response = await self.client.post(url, json=body)
+            response.raise_for_status()
+            return response.text
+
+        if not self.page_cache:
+            return await fetch()
+        key = url if body is None else f"{url}#{json.dumps(body, sort_keys=True)}"
+        return await self.page_cache.through(  # type: ignore[return-value]
+            key, fetcher, fetch, content_type
+        )
+
+    async def _innertube(self, endpoint: str, body: Dict[str, Any]) -> Dict[Any, Any]:
+        try:
+            text = await self._fetch_text(
+                f"{self.base_url}/youtubei/v1/{endpoint}?prettyPrint=false",
+                f"youtube:{endpoint}",
+                body={
+                    "context": {
+                        "client": {
+                            **INNERTUBE_CLIENT,
+                            "clientVersion": self.innertube_client_version,
+                        }
+                    },
+                    **body,
+                },
+                content_type="json",
+            )
+            return json.loads(text)
+        except httpx.HTTPError as e:
+            raise ProviderError(f"InnerTube request failed: {str(e)}") from e
+        except ValueError as e:
+            raise ProviderError(f"InnerTube returned invalid JSON: {str(e)}") from e
+
+    def _continuation_token(self, sections: List[Dict[str, Any]]) -> Optional[str]:
+        for section in sections:
+            token = (
+                section.get("continuationItemRenderer", {})
+                .get("continuationEndpoint", {})
+                .get("continuationCommand", {})
+                .get("token")
+            )
+            if token:
+                return token
+        return None
+
+    async def search_innertube(
+        self, query: str, limit: int = 25, max_pages: int = 3
+    ) -> List[Dict[str, Any]]:
+        """
+        Search through the InnerTube JSON API instead of the HTML results page.
+        - page 1 has the same shape as ytInitialData; continuation pages carry
+          bare section lists, which are wrapped so _parse_search_results reads both
+        - follows continuation tokens until `limit` videos or `max_pages` pages
+        """
+        data = await self._innertube("search", {"query": query})
+        sections = (
+            data.get("contents", {})
+            .get("twoColumnSearchResultsRenderer", {})
+            .get("primaryContents", {})
+            .get("sectionListRenderer", {})
+            .get("contents")
+        )
+        if not sections:
+            raise ProviderError("InnerTube search returned no result sections")
+
+        results = self._parse_search_results(data, limit)
+        token = self._continuation_token(sections)
+
+        for _ in range(max_pages - 1):
+            if len(results) >= limit or not token:
+                break
+            page = await self._innertube("search", {"continuation": token})
+            sections = []
+            for command in page.get("onResponseReceivedCommands", []):
+                sections.extend(
+                    command.get("appendContinuationItemsAction", {}).get(
+                        "continuationItems", []
+                    )
+                )
+            wrapped = {
+                "contents": {
+                    "twoColumnSearchResultsRenderer": {
+                        "primaryContents": {
+                            "sectionListRenderer": {"contents": sections}
+                        }
+                    }
+                }
+            }
+            results.extend(self._parse_search_results(wrapped, limit - len(results)))
+            token = self._continuation_token(sections)
+
+        return results
+
+    async def _initial_data(self, url: str) -> Dict[Any, Any]:
+        try:
+            text = await self._fetch_text(url, "youtube:page")
+        except httpx.HTTPError as e:
+            raise ProviderError(f"YouTube scraping request failed: {str(e)}") from e
+
+        yt_data = self._extract_yt_initial_data(text)
+        if not yt_data:
+            raise ProviderError(f"Could not extract YouTube initial data from {url}")
+        return yt_data
+
+    def _parse_playlist_results(self, yt_data: Dict[Any, Any]) -> List[Dict[str, Any]]:
+        """Playlists on a filtered search page (classic and lockup renderers)"""
+        playlists = []
+        contents = (
+            yt_data.get("contents", {})
+            .get("twoColumnSearchResultsRenderer", {})
+            .get("primaryContents", {})
+            .get("sectionListRenderer", {})
+            .get("contents", [])
+        )
+        for section in contents:
+            for item in section.get("itemSectionRenderer", {}).get("contents", []):
+                renderer = item.get("playlistRenderer")
+                if renderer and renderer.get("playlistId"):
+                    byline = renderer.get("shortBylineText", {}).get("runs", [])
+                    playlists.append(
+                        {
+                            "playlistId": renderer["playlistId"],
+                            "title": renderer.get("title", {}).get("simpleText", ""),
+                            "owner": byline[0].get("text", "") if byline else "",
+                        }
+                    )
+                    continue
+
+                lockup = item.get("lockupViewModel")
+                if (
+                    lockup
+                    and lockup.get("contentType") == "LOCKUP_CONTENT_TYPE_PLAYLIST"
+                ):
+                    meta = lockup.get("metadata", {}).get("lockupMetadataViewModel", {})
+                    rows = (
+                        meta.get("metadata", {})
+                        .get("contentMetadataViewModel", {})
+                        .get("metadataRows", [])
+                    )
+                    parts = rows[0].get("metadataParts", []) if rows else []
+                    playlists.append(
+                        {
+                            "playlistId": lockup.get("contentId", ""),
+                            "title": meta.get("title", {}).get("content", ""),
+                            "owner": (
+                                parts[0].get("text", {}).get("content", "")
+                                if parts
+                                else ""
+                            ),
+                        }
+                    )
+        return [p for p in playlists if p["playlistId"]]
+
+    def _parse_playlist_entries(self, yt_data: Dict[Any, Any]) -> List[Dict[str, Any]]:
+        tabs = (
+            yt_data.get("contents", {})
+            .get("twoColumnBrowseResultsRenderer", {})
+            .get("tabs", [])
+        )
+        entries = []
+        for tab in tabs:
+            sections = (
+                tab.get("tabRenderer", {})
+                .get("content", {})
+                .get("sectionListRenderer", {})
+                .get("contents", [])
+            )
+            for section in sections:
+                for item in section.get("itemSectionRenderer", {}).get("contents", []):
+                    videos = item.get("playlistVideoListRenderer", {}).get(
+                        "contents", []
+                    )
+                    for video in videos:
+                        renderer = video.get("playlistVideoRenderer")
+                        if not renderer or not renderer.get("videoId"):
+                            continue
+                        # Unavailable entries have no duration
+                        try:
+                            duration = int(renderer.get("lengthSeconds") or 0)
+                        except ValueError:
+                            duration = 0
+                        if not duration:
+                            continue
+                        runs = renderer.get("title", {}).get("runs", [])
+                        entries.append(
+                            {
+                                "videoId": renderer["videoId"],
+                                "title": runs[0].get("text", "") if runs else "",
+                                "durationSec": duration,
+                            }
+                        )
+        return entries
+
+    async def find_album_playlist(self, album: str, artist: str) -> Optional[str]:
+        """
+        Find the auto-generated album playlist ("<artist> - Topic" release).
+        Returns its playlist id, or None when no playlist title matches the album.
+        """
+        query = urllib.parse.quote(f"{artist} {album}")
+        yt_data = await self._initial_data(
+            f"{self.base_url}/results?search_query={query}&sp={PLAYLIST_FILTER}"
+        )
+        album_key = title_key(album)
+        artist_key = title_key(artist)
+
+        best = None
+        for playlist in self._parse_playlist_results(yt_data):
+            name = re.sub(r"^album\s*-\s*", "", playlist["title"], flags=re.I)
+            if title_key(name) != album_key:
+                continue
+            owner_key = title_key(playlist["owner"])
+            # Official releases are OLAK5uy_ playlists owned by the Topic channel
+            if playlist["playlistId"].startswith("OLAK5uy_") or artist_key in owner_key:
+                return playlist["playlistId"]
+            best = best or playlist["playlistId"]
+        return best
+
+    async def playlist_entries(self, playlist_id: str) -> List[Dict[str, Any]]:
+        yt_data = await self._initial_data(
+            f"{self.base_url}/playlist?list={urllib.parse.quote(playlist_id)}"
+        )
+        return self._parse_playlist_entries(yt_data)
+
+    async def resolve_album(
+        self, album: str, artist: str, tracks: List[Tuple[str, int]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Map (title, durationSec) tracks onto the album's Topic playlist.
+        - an entry matches when its normalized title equals (or starts with) the
+          track's and its duration is within the usual ±5 s
+        - unmatched tracks come back as None so callers can fall back to search
+        """
+        playlist_id = await self.find_album_playlist(album, artist)
+        if not playlist_id:
+            return [None] * len(tracks)
+
+        entries = await self.playlist_entries(playlist_id)
+        keyed = [(title_key(e["title"]), e) for e in entries]
+        used = set()
+
+        matches: List[Optional[Dict[str, Any]]] = []
+        for title, duration_sec in tracks:
+            key = title_key(title)
+            best = None
+            for entry_key, entry in keyed:
+                if entry["videoId"] in used:
+                    continue
+                diff = abs(entry["durationSec"] - duration_sec)
+                if diff > self.duration_match_threshold:
+                    continue
+                if entry_key != key and not (
+                    key
+                    and entry_key
+                    and (entry_key.startswith(key) or key.startswith(entry_key))
+                ):
+                    continue
+                if best is None or diff < abs(best["durationSec"] - duration_sec):
+                    best = entry
+
+            if best is None:
+                matches.append(None)
+                continue
+            used.add(best["videoId"])
+            matches.append(
+                {
+                    "videoId": best["videoId"],
+                    "title": best["title"],
+                    "durationSec": best["durationSec"],
+                    "url": f"https://youtube.com/watch?v={best['videoId']}",
+                    "category": "10",
+                }
+            )
+        return matches
+
+    def _ydl_opts(self, cookies_path: str = "") -> Dict[str, Any]:
+        return {
+            "format": "bestaudio[ext=m4a]/bestaudio[ext=mp4]/bestaudio/best[height<=480]/best",
+            "noplaylist": True,
+            # "quiet": True,
+            "verbose": True,
+            "no_warnings": True,
+            "socket_timeout": 15,
+            "retries": 3,
+            "concurrent_fragment_downloads": 4,
+            "extract_flat": False,
+            "ignoreerrors": False,
+            "cookiefile": cookies_path or None,
+            "extractor_args": {
+                "youtube": {
+                    "player_client": ["default"],
+                    "player_js_version": ["actual"],
+                }
+            },
+        }
+
+    def resolve_audio(self, url: str, cookies_path: str = "") -> Dict[str, Any]:
+        """Resolve the direct media url (and the headers it needs) without downloading"""
+        with YoutubeDL(self._ydl_opts(cookies_path)) as ydl:  # type: ignore
+            info = ydl.extract_info(url, download=False)
+
+        if not info:
+            raise ProviderError(f"yt-dlp returned no info for {url}")
+        fmt = info if info.get("url") else (info.get("requested_formats") or [{}])[0]
+        if not fmt.get("url"):
+            raise ProviderError(f"No audio stream url resolved for {url}")
+
+        return {
+            "url": fmt["url"],
+            "headers": fmt.get("http_headers") or info.get("http_headers") or {},
+            "format_id": fmt.get("format_id"),
+            "acodec": fmt.get("acodec"),
+            "abr": fmt.get("abr"),
+            "ext": fmt.get("ext"),
+        }
+
+    def download_audio(
+        self,
+        url: str,
+        out_dir: str,
+        cookies_path: str = "",
+        section: Optional[Tuple[float, float]] = None,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> Tuple[str, int, Dict[str, Any]]:
+        """
+        Download the best audio stream of `url` into `out_dir` with yt-dlp.
+        - `section` (start, end) in seconds fetches only that time range; yt-dlp
+          hands it to ffmpeg, which seeks into the remote stream instead of
+          pulling the whole track
+        - returns the downloaded file path, the number of bytes fetched and the
+          chosen format (format_id, acodec, abr, ext)
+        - setting `cancel_event` aborts the download at the next progress update
+        """
+        downloaded: Dict[str, int] = {}
+
+        def on_progress(d: Dict[str, Any]):
+            if cancel_event is not None and cancel_event.is_set():
+                raise DownloadCancelled("Download cancelled")
+            size = d.get("downloaded_bytes") or d.get("total_bytes") or 0
+            name = d.get("filename") or ""
+            downloaded[name] = max(downloaded.get(name, 0), size)
+
+        ydl_opts = self._ydl_opts(cookies_path)
+        ydl_opts["outtmpl"] = {"default": os.path.join(out_dir, "%(id)s.%(ext)s")}
+        ydl_opts["progress_hooks"] = [on_progress]
+        if section:
+            ydl_opts["download_ranges"] = download_range_func(None, [section])
+
+        with YoutubeDL(ydl_opts) as ydl:  # type: ignore
+            info = ydl.extract_info(url, download=True)
+            if not info:
+                raise RuntimeError("yt-dlp failed")
+
+        files = [
+            f
+            for f in os.listdir(out_dir)
+            if not f.endswith(".part") and not f.endswith(".info.json")
+        ]
+        if not files:
+            raise RuntimeError("No file produced")
+
+        files.sort(key=lambda f: os.path.getmtime(os.path.join(out_dir, f)))
+        src = os.path.join(out_dir, files[-1])
+
+        fmt = (
+            info
+            if info.get("format_id")
+            else (info.get("requested_formats") or [{}])[0]
+        )
+        return (
+            src,
+            sum(downloaded.values()) or os.path.getsize(src),
+            {
+                "format_id": fmt.get("format_id"),
+                "acodec": fmt.get("acodec"),
+                "abr": fmt.get("abr"),
+                "ext": fmt.get("ext"),
+            },
+        )
+
+    async def cut_to_m4a(
+        self,
+        src: str,
+        dst: str,
+        start: float,
+        dur: float,
+        bitrate_kbps: int,
+        copy: bool = False,
     ):
+        """Cut `dur` seconds from `start`; `copy` keeps the AAC frames as they are"""
         cmd = [
             FFMPEG,
             "-hide_banner",
@@ -210,15 +881,76 @@ class YoutubeScraper:
             "-i",
             src,
             "-vn",
-            "-c:a",
-            "aac",
-            "-b:a",
-            f"{bitrate_kbps}k",
+            *_audio_codec_args(copy, bitrate_kbps),
             "-movflags",
             "faststart",
             dst,
         ]
-        subprocess.run(cmd, check=True)
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            _, stderr = await proc.communicate()
+        except asyncio.CancelledError:
+            proc.kill()
+            await proc.wait()
+            raise
+
+        if proc.returncode != 0:
+            raise ProviderError(
+                f"ffmpeg exited with {proc.returncode}: {stderr.decode(errors='replace')[-500:]}"
+            )
+
+    async def stream_m4a(
+        self,
+        src_url: str,
+        headers: Dict[str, str],
+        start: float,
+        dur: float,
+        bitrate_kbps: int,
+        copy: bool = False,
+    ) -> Tuple[asyncio.subprocess.Process, "asyncio.Task[bytes]"]:
+        """
+        Start ffmpeg reading `src_url` and writing fragmented MP4 to stdout.
+        - for remote streams ffmpeg seeks with ranged reads, so only the previewed
+          window is fetched; local paths (cached sources) work the same way
+        - fragmented output needs no seek-back, so bytes can be sent as produced;
+          audio has no video keyframes to cut at, so fragments are cut every second
+        - `copy` keeps the AAC frames as they are instead of re-encoding
+        - returns the process and a task draining its stderr, which resolves to
+          the tail of ffmpeg's error output once it exits
+        """
+        header_blob = "".join(f"{k}: {v}\r\n" for k, v in headers.items())
+        cmd = [
+            FFMPEG,
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            *(["-headers", header_blob] if header_blob else []),
+            "-ss",
+            str(start),
+            "-t",
+            str(dur),
+            "-i",
+            src_url,
+            "-vn",
+            *_audio_codec_args(copy, bitrate_kbps),
+            "-movflags",
+            "frag_keyframe+empty_moov+default_base_moof",
+            "-frag_duration",
+            "1000000",
+            "-f",
+            "mp4",
+            "pipe:1",
+        ]
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        assert proc.stderr is not None
+        return proc, asyncio.ensure_future(_stderr_tail(proc.stderr))
 
 
 # class Youtube:
@@ -0,0 +1,40 @@
+import json
+import re
+from typing import Any, Dict, Optional
+
+import orjson
+
+# Matches `var ytInitialData = {`, `window["ytInitialData"] = {` and `"ytInitialData":{`
+YT_INITIAL_DATA = re.compile(r'ytInitialData"?\]?\s*[=:]\s*(?=\{)')
+SCRIPT_END = ";</script>"
+
+_decoder = json.JSONDecoder()
+
+
+def extract_yt_initial_data(html: str) -> Optional[Dict[Any, Any]]:
+    """
+    Decode the ytInitialData object embedded in a YouTube page in one pass.
+    - the assignment is located once; the object is sliced up to the closing
+      `;</script>` and decoded with orjson
+    - if that slice is not valid JSON, the stdlib raw decoder scans exactly one
+      object from the same offset, so trailing script text is never parsed
+    """
+    match = YT_INITIAL_DATA.search(html)
+    if not match:
+        return None
+    start = match.end()
+
+    end = html.find(SCRIPT_END, start)
+    if end != -1:
+        try:
+            data = orjson.loads(html[start:end])
+            if isinstance(data, dict):
+                return data
+        except orjson.JSONDecodeError:
+            pass
+
+    try:
+        data, _ = _decoder.raw_decode(html, start)
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
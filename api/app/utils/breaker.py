@@ -0,0 +1,172 @@
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional
+
+from app.utils.logger import BusyError, NoResultsError, logger
+
+
+class CircuitOpenError(BusyError):
+    """A provider's breaker is open; the call was refused without trying it"""
+
+    def __init__(self, name: str, retry_after_sec: float):
+        super().__init__(f"{name} is failing, not trying it for {retry_after_sec:.0f}s")
+        self.name = name
+        self.retry_after_sec = retry_after_sec
+
+
+def busy_headers(e: BusyError) -> Optional[Dict[str, str]]:
+    """Response headers for a 503: breakers say when to come back and which one tripped"""
+    if isinstance(e, CircuitOpenError):
+        return {
+            "Retry-After": str(max(1, round(e.retry_after_sec))),
+            "X-Circuit-Breaker": e.name,
+        }
+    return None
+
+
+class BreakerCall:
+    """Handle for one guarded call; fail() marks it failed without raising"""
+
+    def __init__(self) -> None:
+        self.failed = False
+
+    def fail(self) -> None:
+        self.failed = True
+
+
+class CircuitBreaker:
+    """
+    Per-worker failure-rate breaker around one upstream provider.
+    - closed: calls go through; once the last `window` calls hold at least
+      `min_calls` outcomes and `failure_rate` of them failed, the breaker opens
+    - open: calls fail fast with CircuitOpenError for `open_sec`, doubling on
+      every failed probe up to `max_open_sec`
+    - half-open: up to `probes` calls go through; a successful probe closes the
+      breaker, a failed one opens it again
+    - NoResultsError is an answer, so it counts as a success unless
+      `count_no_results` is set for providers whose breakage looks like empty
+      results (markup changes); so is any error `answered` accepts (e.g. a
+      private video); BusyError and cancellation are not counted
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        open_sec: float = 30.0,
+        max_open_sec: float = 300.0,
+        probes: int = 1,
+        count_no_results: bool = False,
+        answered: Optional[Callable[[BaseException], bool]] = None,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_sec = open_sec
+        self.max_open_sec = max_open_sec
+        self.probes = probes
+        self.count_no_results = count_no_results
+        self.answered = answered
+        self.state = "closed"
+        self.opened = 0
+        self.rejected = 0
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._cooldown = open_sec
+        self._open_until = 0.0
+        self._probing = 0
+
+    @asynccontextmanager
+    async def guard(self) -> AsyncIterator[BreakerCall]:
+        probe = self.before()
+        call = BreakerCall()
+        try:
+            yield call
+        except BaseException as e:
+            ok = self._outcome(e)
+            if ok is not None:
+                self._record(ok, probe)
+            elif probe:
+                self._probing -= 1
+            raise
+        else:
+            self._record(not call.failed, probe)
+
+    def before(self) -> bool:
+        """Admit a call or raise CircuitOpenError; True when the call is a probe"""
+        if self.state == "closed":
+            return False
+
+        now = time.monotonic()
+        if self.state == "open":
+            if now < self._open_until:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self._open_until - now)
+            self.state = "half_open"
+            logger.info("Circuit %s half-open, probing", self.name)
+
+        if self._probing >= self.probes:
+            self.rejected += 1
+            raise CircuitOpenError(self.name, self._cooldown / 2)
+        self._probing += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        failures = sum(1 for ok in self._outcomes if not ok)
+        return {
+            "name": self.name,
+            "state": self.state,
+            "calls": len(self._outcomes),
+            "failureRate": (
+                round(failures / len(self._outcomes), 3) if self._outcomes else 0.0
+            ),
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "retryAfterSec": (
+                round(max(0.0, self._open_until - time.monotonic()), 1)
+                if self.state == "open"
+                else None
+            ),
+        }
+
+    def _outcome(self, e: BaseException) -> Optional[bool]:
+        """True/False for a success/failure to record, None to leave uncounted"""
+        if not isinstance(e, Exception) or isinstance(e, BusyError):
+            return None
+        if isinstance(e, NoResultsError):
+            return not self.count_no_results
+        return bool(self.answered and self.answered(e))
+
+    def _record(self, ok: bool, probe: bool) -> None:
+        if probe:
+            self._probing -= 1
+            if ok:
+                logger.info("Circuit %s closed", self.name)
+                self.state = "closed"
+                self._outcomes.clear()
+                self._cooldown = self.open_sec
+            else:
+                self._cooldown = min(self.max_open_sec, self._cooldown * 2)
+                self._open()
+            return
+
+        self._outcomes.append(ok)
+        if self.state != "closed" or len(self._outcomes) < self.min_calls:
+            return
+        failures = sum(1 for outcome in self._outcomes if not outcome)
+        if failures / len(self._outcomes) >= self.failure_rate:
+            self._open()
+
+    def _open(self) -> None:
+        self.state = "open"
+        self.opened += 1
+        self._open_until = time.monotonic() + self._cooldown
+        logger.warning(
+            "Circuit %s open for %.0fs (%d/%d recent calls failed)",
+            self.name,
+            self._cooldown,
+            sum(1 for ok in self._outcomes if not ok),
+            len(self._outcomes),
+        )
@@ -12,6 +12,50 @@ class Settings(BaseSettings):
     youtube_cookies_path: str = ""
     cf_client_id: str = ""
     cf_client_secret: str = ""
+    browser_pool_contexts: int = 2
+    browser_pool_tabs: int = 4
+    lyrics_batch_concurrency: int = 4
+    host_limits_path: str = ".cache/host-limits.sqlite3"
+    host_limits_acquire_timeout_sec: float = 30.0
+    page_cache_path: str = ".cache/pages.sqlite3"
+    page_cache_mode: str = "write"  # or "replay", "offline"
+    page_cache_max_age_sec: int = 7 * 24 * 3600  # replay mode refetches older pages
+    page_cache_max_bytes: int = 1024**3
+    lyrics_hedge_delay_sec: float = 3.0  # until enough latency samples exist
+    lyrics_hedge_min_delay_sec: float = 0.5
+    lyrics_hedge_max_delay_sec: float = 10.0
+    genius_http_max_connections: int = 20
+    genius_http_max_keepalive: int = 10
+    genius_http_retries: int = 3
+    youtube_http_max_connections: int = 20
+    youtube_http_max_keepalive: int = 10
+    youtube_search_batch_concurrency: int = 4
+    youtube_search_backend: str = "html"  # or "innertube"
+    youtube_innertube_client_version: str = "2.20250923.01.00"
+    youtube_innertube_pages: int = 1  # >1 follows search continuations
+    youtube_search_fanout: bool = True
+    youtube_search_fanout_enough: int = 3
+    youtube_search_fanout_hedge_sec: float = 2.0  # wait on the original query
+    preview_streaming: bool = True
+    preview_partial_download: bool = True
+    preview_preroll_sec: float = 2.0
+    preview_hedge_delay_sec: float = 4.0
+    preview_hedge_max_parallel: int = 2
+    preview_cache_path: str = ".cache/previews"
+    preview_cache_max_bytes: int = 2 * 1024**3
+    source_cache_path: str = ".cache/sources"
+    source_cache_max_bytes: int = 5 * 1024**3
+    source_cache_prefetch: bool = False  # full download on a video's second preview
+    preview_jobs_path: str = ".cache/preview-jobs"
+    preview_jobs_ttl_sec: int = 3600
+    preview_jobs_max_pending: int = 500
+    preview_job_workers: int = 2
+    media_max_workers: int = 0  # 0 = one per CPU core
+    media_max_queue: int = 16
+    lyrics_cache_path: str = ".cache/lyrics.sqlite3"
+    lyrics_cache_ttl_sec: int = 30 * 24 * 3600
+    lyrics_cache_negative_ttl_sec: int = 6 * 3600
+    lyrics_cache_max_entries: int = 50_000
 
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=False)
 
@@ -0,0 +1,85 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Strong refs to discard() calls scheduled for late losers
+_reaping: set = set()
+
+
+def _reap(
+    task: asyncio.Future, discard: Optional[Callable[[T], Awaitable[None]]]
+) -> None:
+    if task.cancelled():
+        return
+    if task.exception() is None and discard:
+        job = asyncio.ensure_future(discard(task.result()))
+        _reaping.add(job)
+        job.add_done_callback(_reaping.discard)
+
+
+async def hedged(
+    attempts: Sequence[Callable[[], Awaitable[T]]],
+    delay_sec: float,
+    max_parallel: int = 2,
+    discard: Optional[Callable[[T], Awaitable[None]]] = None,
+) -> Tuple[int, T]:
+    """
+    Run `attempts` in order, racing a backup whenever the running ones are slow.
+    - the next attempt starts once the running ones have been quiet for
+      `delay_sec`, or right away when one of them fails
+    - at most `max_parallel` attempts run at once
+    - the first success wins and the rest are cancelled without waiting; losers
+      that finish anyway are handed to `discard` so they can release what they hold
+    - returns (index of the winning attempt, its result); raises the last error
+      when every attempt fails
+    """
+    if not attempts:
+        raise ValueError("hedged() needs at least one attempt")
+
+    max_parallel = max(1, max_parallel)
+    running: Dict[asyncio.Future, int] = {}
+    errors: List[BaseException] = []
+    next_idx = 0
+    start_next = True
+
+    try:
+        while next_idx < len(attempts) or running:
+            can_start = next_idx < len(attempts) and len(running) < max_parallel
+            if can_start and (start_next or not running):
+                running[asyncio.ensure_future(attempts[next_idx]())] = next_idx
+                next_idx += 1
+                can_start = next_idx < len(attempts) and len(running) < max_parallel
+
+            done, _ = await asyncio.wait(
+                running,
+                timeout=delay_sec if can_start else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            # Timed out: the running attempts are slow, so hedge with the next one
+            start_next = not done
+
+            winners = []
+            for task in done:
+                idx = running.pop(task)
+                if task.exception() is None:
+                    winners.append((idx, task))
+                else:
+                    errors.append(task.exception())  # type: ignore[arg-type]
+                    start_next = True
+
+            if winners:
+                winners.sort(key=lambda w: w[0])
+                for _, loser in winners[1:]:
+                    if discard:
+                        await discard(loser.result())
+                idx, task = winners[0]
+                return idx, task.result()
+    finally:
+        # Losers are not awaited: a thread stuck in a socket read must not hold
+        # up the winner. They finish cancelling in the background.
+        for task in running:
+            task.cancel()
+            task.add_done_callback(lambda t: _reap(t, discard))
+
+    raise errors[-1]
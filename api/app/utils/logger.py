@@ -29,7 +29,9 @@ def setup_logging_and_handlers(app):
             exc.detail,
         )
         return ORJSONResponse(
-            status_code=exc.status_code, content={"detail": exc.detail}
+            status_code=exc.status_code,
+            content={"detail": exc.detail},
+            headers=getattr(exc, "headers", None),
         )
 
     @app.exception_handler(Exception)
@@ -46,3 +48,7 @@ class NoResultsError(Exception):
 
 class ProviderError(Exception):
     pass
+
+
+class BusyError(Exception):
+    pass
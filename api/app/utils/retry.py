@@ -0,0 +1,105 @@
+import asyncio
+import email.utils
+import random
+import time
+from typing import Optional
+
+import httpx
+
+from app.utils.logger import logger
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def retry_after_sec(response: httpx.Response) -> Optional[float]:
+    """Retry-After as seconds; the header is either a number or an HTTP date"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class RetryTransport(httpx.AsyncBaseTransport):
+    """
+    Retries idempotent requests on 429/5xx and connection errors.
+    - waits full-jitter exponential backoff: random(0, backoff * 2^attempt),
+      capped at `max_backoff_sec`
+    - a Retry-After header replaces the backoff; when it asks for longer than
+      `max_backoff_sec` the response is returned as is instead of waiting
+    - the last response (or error) is passed through once retries run out
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        retries: int = 3,
+        backoff_sec: float = 0.5,
+        max_backoff_sec: float = 10.0,
+    ):
+        self._transport = transport
+        self.retries = retries
+        self.backoff_sec = backoff_sec
+        self.max_backoff_sec = max_backoff_sec
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method not in RETRY_METHODS:
+            return await self._transport.handle_async_request(request)
+
+        attempt = 0
+        while True:
+            try:
+                response = await self._transport.handle_async_request(request)
+            except (httpx.ConnectError, httpx.ReadError, httpx.RemoteProtocolError):
+                if attempt >= self.retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.info(
+                    "Retrying %s %s after connection error (%d/%d)",
+                    request.method,
+                    request.url.host,
+                    attempt + 1,
+                    self.retries,
+                )
+            else:
+                if (
+                    response.status_code not in RETRY_STATUSES
+                    or attempt >= self.retries
+                ):
+                    return response
+
+                delay = retry_after_sec(response)
+                if delay is None:
+                    delay = self._backoff(attempt)
+                elif delay > self.max_backoff_sec:
+                    return response
+
+                await response.aclose()
+                logger.info(
+                    "Retrying %s %s after HTTP %d in %.2fs (%d/%d)",
+                    request.method,
+                    request.url.host,
+                    response.status_code,
+                    delay,
+                    attempt + 1,
+                    self.retries,
+                )
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(
+            0, min(self.max_backoff_sec, self.backoff_sec * 2**attempt)
+        )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
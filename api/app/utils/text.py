@@ -0,0 +1,44 @@
+import re
+import unicodedata
+
+from unidecode import unidecode
+
+
+def normalize_text(text: str, keep_punctuation: bool = True) -> str:
+    if not text:
+        return ""
+
+    # Normalize unicode (NFKC = compatibility composition)
+    text = unicodedata.normalize("NFKC", text)
+
+    # Lowercase
+    text = text.lower()
+
+    # Trim + collapse whitespace
+    text = " ".join(text.split())
+
+    # Optionally strip punctuation
+    if not keep_punctuation:
+        text = re.sub(r"[^\w\s]", "", text)
+
+    # Transliterate (optional, e.g. Cyrillic → Latin)
+    text = unidecode(text)
+
+    # Standardize spacing around dots so acronyms like "m . a . a . d" become "m.a.a.d"
+    # Only apply when punctuation is preserved.
+    if keep_punctuation:
+        # Remove spaces surrounding dots
+        text = re.sub(r"\s*\.\s*", ".", text)
+        # Collapse repeated dots (e.g. "..." -> ".")
+        text = re.sub(r"\.{2,}", ".", text)
+        # Trim stray spaces or dots at ends
+        text = text.strip(". ")
+
+    return text
+
+
+def title_key(title: str) -> str:
+    """Comparable title: drops (feat. ...), [Official Audio] and " - Remastered" suffixes"""
+    title = re.sub(r"\s*[\(\[].*?[\)\]]", "", title)
+    title = re.split(r"\s+-\s+", title, maxsplit=1)[0]
+    return normalize_text(title, keep_punctuation=False)
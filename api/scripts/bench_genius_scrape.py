@@ -0,0 +1,62 @@
+"""
+Compare the static (httpx + lxml) and browser (crawl4ai) Genius lyric scrapes.
+
+    uv run python -m scripts.bench_genius_scrape https://genius.com/Kendrick-lamar-money-trees-lyrics
+    uv run python -m scripts.bench_genius_scrape --html saved_page.html
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.services.genius import Genius
+
+
+async def bench_url(genius: Genius, url: str, runs: int):
+    for name, scrape in (
+        ("static", genius._scrape_lyrics_static),
+        ("browser", genius._scrape_lyrics_browser),
+    ):
+        timings = []
+        lines = 0
+        for _ in range(runs):
+            started = time.perf_counter()
+            res = await scrape(url)
+            timings.append(time.perf_counter() - started)
+            md = res[0] if isinstance(res, tuple) else res
+            lines = len(genius.clean_lyrics_markdown(md).splitlines()) if md else 0
+        print(
+            f"{name:>8}: best {min(timings) * 1000:8.1f} ms"
+            f"  mean {sum(timings) / runs * 1000:8.1f} ms  lines {lines}"
+        )
+
+
+def bench_html(genius: Genius, path: str, runs: int):
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+    started = time.perf_counter()
+    for _ in range(runs):
+        md = genius._parse_lyrics_html(html)
+    elapsed = (time.perf_counter() - started) / runs
+    lines = len(genius.clean_lyrics_markdown(md).splitlines()) if md else 0
+    print(f"   parse: {elapsed * 1000:8.2f} ms/page ({len(html)} bytes, {lines} lines)")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("url", nargs="?")
+    parser.add_argument("--html", help="parse a saved Genius page instead of fetching")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    genius = Genius(access_token="bench")
+    try:
+        if args.html:
+            bench_html(genius, args.html, args.runs)
+        if args.url:
+            await bench_url(genius, args.url, args.runs)
+    finally:
+        await genius.aclose()
+
+
+asyncio.run(main())
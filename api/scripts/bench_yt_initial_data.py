@@ -0,0 +1,82 @@
+"""
+CPU per search page for the ytInitialData extractor vs the old regex patterns.
+
+    uv run python -m scripts.bench_yt_initial_data saved_results_page.html
+    uv run python -m scripts.bench_yt_initial_data --query "money trees kendrick lamar"
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import time
+import urllib.parse
+
+from app.services.youtube import YoutubeScraper
+from app.services.yt_initial_data import extract_yt_initial_data
+
+LEGACY_PATTERNS = [
+    r'window\["ytInitialData"\]\s*=\s*({.+?});',
+    r"var ytInitialData\s*=\s*({.+?});",
+    r'ytInitialData"\s*:\s*({.+?}),',
+    r"ytInitialData\s*=\s*({.+?});",
+]
+
+
+def legacy_extract(html: str):
+    for pattern in LEGACY_PATTERNS:
+        match = re.search(pattern, html, re.DOTALL)
+        if match:
+            try:
+                return json.loads(match.group(1))
+            except json.JSONDecodeError:
+                continue
+    return None
+
+
+def bench(name: str, fn, html: str, runs: int):
+    data = fn(html)
+    started = time.process_time()
+    for _ in range(runs):
+        fn(html)
+    cpu = (time.process_time() - started) / runs
+    print(f"{name:>8}: {cpu * 1000:8.2f} ms cpu/page  decoded={data is not None}")
+    return data
+
+
+async def fetch(query: str) -> str:
+    scraper = YoutubeScraper()
+    try:
+        url = "https://www.youtube.com/results?search_query=" + urllib.parse.quote(
+            query
+        )
+        resp = await scraper.client.get(url)
+        resp.raise_for_status()
+        return resp.text
+    finally:
+        await scraper.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("html", nargs="?", help="saved /results page")
+    parser.add_argument("--query", help="fetch a live search page instead")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.query:
+        html = asyncio.run(fetch(args.query))
+    elif args.html:
+        with open(args.html, encoding="utf-8") as f:
+            html = f.read()
+    else:
+        parser.error("pass a saved page or --query")
+
+    print(f"page: {len(html)} chars")
+    legacy = bench("legacy", legacy_extract, html, args.runs)
+    fast = bench("fast", extract_yt_initial_data, html, args.runs)
+    if legacy is not None and fast is not None:
+        print(f"   equal: {legacy == fast}")
+
+
+main()
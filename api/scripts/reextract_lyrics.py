@@ -0,0 +1,104 @@
+"""
+Re-run lyric extraction and cleaning over the raw pages in the page cache,
+without touching the network, e.g. after changing clean_lyrics_markdown().
+
+    uv run python -m scripts.reextract_lyrics
+    uv run python -m scripts.reextract_lyrics --fetcher genius:browser --out lyrics.jsonl
+    uv run python -m scripts.reextract_lyrics --fetcher musixmatch:browser --limit 100
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from crawl4ai import AsyncWebCrawler
+
+from app.services.base import LyricsBaseProvider
+from app.services.genius import Genius
+from app.services.musixmatch import Musixmatch
+from app.services.page_cache import PageCache
+from app.utils.config import get_settings
+
+# Page cache fetchers that hold lyric pages: genius:static pages are parsed
+# with lxml, *:browser pages are replayed through crawl4ai. The others
+# (genius:api, musixmatch:search, youtube:*) hold API and search responses.
+LYRICS_FETCHERS = ("genius:static", "genius:browser", "musixmatch:browser")
+
+
+def provider_for(fetcher: str) -> LyricsBaseProvider:
+    if fetcher.startswith("genius:"):
+        return Genius(access_token="reextract")
+    if fetcher.startswith("musixmatch:"):
+        return Musixmatch(musixmatch_profile_path="")
+    raise SystemExit(f"No lyrics provider for fetcher {fetcher}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default=get_settings().page_cache_path)
+    parser.add_argument(
+        "--fetcher",
+        default="genius:static",
+        choices=LYRICS_FETCHERS,
+        help="genius:static pages are parsed with lxml, *:browser pages "
+        "are replayed through crawl4ai",
+    )
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--out", help="write {url, fetchedAt, lyrics} lines here")
+    args = parser.parse_args()
+
+    cache = PageCache(args.db, mode="offline")
+    provider = provider_for(args.fetcher)
+    out = open(args.out, "w", encoding="utf-8") if args.out else None
+    crawler = None
+    if args.fetcher.endswith(":browser"):
+        crawler = AsyncWebCrawler()
+        await crawler.start()
+
+    pages = found = 0
+    started = time.perf_counter()
+    try:
+        for page in cache.pages(args.fetcher):
+            if args.limit and pages >= args.limit:
+                break
+            pages += 1
+
+            if crawler is not None:
+                result = await crawler.arun(
+                    f"raw:{page.content}", config=provider.lyrics_run_config()
+                )
+                md = result.markdown if result.success else None  # type: ignore
+            else:
+                md = provider._parse_lyrics_html(page.content)  # type: ignore
+
+            lyrics = provider.clean_lyrics_markdown(md) if md else None
+            if lyrics:
+                found += 1
+            if out:
+                out.write(
+                    json.dumps(
+                        {
+                            "url": page.url,
+                            "fetchedAt": page.fetched_at,
+                            "lyrics": lyrics,
+                        }
+                    )
+                    + "\n"
+                )
+    finally:
+        if crawler is not None:
+            await crawler.close()
+        if out:
+            out.close()
+        await provider.aclose()
+        cache.close()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"{pages} {args.fetcher} pages, {found} with lyrics"
+        f" in {elapsed:.2f}s ({elapsed / max(pages, 1) * 1000:.1f} ms/page)"
+    )
+
+
+asyncio.run(main())
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from app.services.genius import Genius
+
+
+@pytest.fixture
+def genius():
+    genius = Genius(access_token="test")
+    yield genius
+    asyncio.run(genius.aclose())
+
+
+def test_parse_lyrics_html_reads_every_container(genius, fixture_text):
+    md = genius._parse_lyrics_html(fixture_text("genius_song.html"))
+
+    assert md == "\n".join(
+        [
+            "[Verse 1: Test Artist]",
+            "First line of the first verse",
+            "Second line with italic words",
+            "Third line, still & going",
+            "Fourth line ends the verse",
+            "",
+            "[Chorus]",
+            "Chorus line one",
+            "Chorus line two",
+            "[Verse 2]",
+            "Second verse opens here",
+            "An annotated line trailing text",
+            "Last line of the song",
+        ]
+    )
+
+
+def test_parse_lyrics_html_drops_excluded_header(genius, fixture_text):
+    md = genius._parse_lyrics_html(fixture_text("genius_song.html"))
+
+    assert "Contributors" not in md
+    assert "Translations" not in md
+    assert "Ad slot" not in md
+
+
+def test_parsed_lyrics_clean_like_the_browser_path(genius, fixture_text):
+    md = genius._parse_lyrics_html(fixture_text("genius_song.html"))
+
+    cleaned = genius.clean_lyrics_markdown(md).splitlines()
+
+    assert cleaned[0] == "### verse 1: test artist"
+    assert "### chorus" in cleaned
+    assert "### verse 2" in cleaned
+    assert cleaned[-1] == "Last line of the song"
+
+
+@pytest.mark.parametrize("html", ["", "<html><body><p>No lyrics</p></body></html>"])
+def test_parse_lyrics_html_without_lyrics(genius, html):
+    assert genius._parse_lyrics_html(html) is None
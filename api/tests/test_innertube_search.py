@@ -0,0 +1,119 @@
+import asyncio
+import copy
+import json
+
+import httpx
+import pytest
+
+from app.services.youtube import YoutubeScraper
+from app.services.yt_initial_data import extract_yt_initial_data
+
+
+class StubYoutube:
+    """Answers /youtubei/v1/search and /results from the recorded results page"""
+
+    def __init__(self, results_html, search_status=200, empty=False):
+        self.results_html = results_html
+        self.search_status = search_status
+        self.empty = empty
+        self.requests = []
+
+        first = extract_yt_initial_data(results_html)
+        video = next(
+            item
+            for item in first["contents"]["twoColumnSearchResultsRenderer"][
+                "primaryContents"
+            ]["sectionListRenderer"]["contents"][0]["itemSectionRenderer"]["contents"]
+            if "videoRenderer" in item
+        )
+        more = copy.deepcopy(video)
+        more["videoRenderer"]["videoId"] = "fixCONTINU5"
+
+        # The recorded page already ends in a continuationItemRenderer
+        self.first_page = first
+        self.next_page = {
+            "onResponseReceivedCommands": [
+                {
+                    "appendContinuationItemsAction": {
+                        "continuationItems": [
+                            {"itemSectionRenderer": {"contents": [more]}}
+                        ]
+                    }
+                }
+            ]
+        }
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.url.path == "/youtubei/v1/search":
+            if self.search_status != 200:
+                return httpx.Response(self.search_status)
+            body = json.loads(request.content)
+            if self.empty:
+                return httpx.Response(200, json={"contents": {}})
+            if "continuation" in body:
+                return httpx.Response(200, json=self.next_page)
+            return httpx.Response(200, json=self.first_page)
+        if request.url.path == "/results":
+            return httpx.Response(200, text=self.results_html)
+        return httpx.Response(404)
+
+    def paths(self):
+        return [r.url.path for r in self.requests]
+
+
+def search(stub, **kwargs):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(stub)) as client:
+            scraper = YoutubeScraper(client=client, **kwargs)
+            return await scraper._search_results("fixture song", 25)
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def stub(fixture_text):
+    return StubYoutube(fixture_text("yt_results_var.html"))
+
+
+def test_html_is_the_default_backend(stub):
+    results = search(stub)
+
+    assert stub.paths() == ["/results"]
+    assert [r["videoId"] for r in results] == [
+        "fixAAAAAAA1",
+        "fixAAAAAAA2",
+        "fixAAAAAAA3",
+    ]
+
+
+def test_innertube_follows_continuations(stub):
+    results = search(stub, search_backend="innertube", innertube_pages=2)
+
+    assert stub.paths() == ["/youtubei/v1/search", "/youtubei/v1/search"]
+    assert [r["videoId"] for r in results] == [
+        "fixAAAAAAA1",
+        "fixAAAAAAA2",
+        "fixAAAAAAA3",
+        "fixCONTINU5",
+    ]
+
+
+def test_innertube_sends_the_configured_client_version(stub):
+    search(stub, search_backend="innertube", innertube_client_version="2.99990101")
+
+    body = json.loads(stub.requests[0].content)
+    assert body["context"]["client"]["clientVersion"] == "2.99990101"
+    assert body["query"] == "fixture song"
+
+
+@pytest.mark.parametrize(
+    "options", [{"empty": True}, {"search_status": 500}, {"search_status": 403}]
+)
+def test_innertube_falls_back_to_results_page(fixture_text, options):
+    stub = StubYoutube(fixture_text("yt_results_var.html"), **options)
+
+    results = search(stub, search_backend="innertube")
+
+    assert stub.paths()[-1] == "/results"
+    assert len(results) == 3
@@ -0,0 +1,34 @@
+from app.services.latency import LatencyTracker
+
+
+def test_censored_samples_below_the_estimate_are_ignored():
+    tracker = LatencyTracker(min_samples=3)
+    for elapsed in (2.0, 2.2, 2.4):
+        tracker.record("slow", elapsed)
+    for _ in range(10):
+        tracker.record_censored("slow", 0.1)
+
+    assert tracker.percentile("slow", 50) == 2.2
+
+
+def test_censored_samples_only_raise_the_estimate():
+    tracker = LatencyTracker(min_samples=3)
+    for elapsed in (1.0, 1.1, 1.2):
+        tracker.record("fast", elapsed)
+        tracker.record("slow", elapsed)
+    for _ in range(4):
+        tracker.record_censored("slow", 3.0)
+
+    assert tracker.percentile("slow", 50) == 3.0
+    assert tracker.order(["slow", "fast"]) == ["fast", "slow"]
+
+
+def test_censored_samples_alone_do_not_rank_a_provider():
+    tracker = LatencyTracker(min_samples=3)
+    for elapsed in (1.0, 1.1, 1.2):
+        tracker.record("measured", elapsed)
+    for _ in range(5):
+        tracker.record_censored("loser", 0.1)
+
+    assert tracker.percentile("loser", 50) is None
+    assert tracker.order(["loser", "measured"]) == ["measured", "loser"]
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from app.services.youtube import YoutubeScraper, query_variants
+from app.utils.logger import NoResultsError
+
+
+def video(video_id, duration_sec=200):
+    return {
+        "videoId": video_id,
+        "title": f"Song {video_id}",
+        "durationSec": duration_sec,
+        "url": f"https://www.youtube.com/watch?v={video_id}",
+        "uploader": "Artist",
+    }
+
+
+def search_match(answers, delay=0.0, **kwargs):
+    """search_match against canned results per query, recording the queries sent"""
+    sent = []
+
+    async def run():
+        scraper = YoutubeScraper()
+
+        async def results(query, limit):
+            sent.append(query)
+            await asyncio.sleep(delay if query == original else 0)
+            return answers.get(query, [])
+
+        scraper._search_results = results
+        try:
+            return await scraper.search_match("Song", "Artist", 200, **kwargs)
+        finally:
+            await scraper.aclose()
+
+    original = query_variants("Song", "Artist")[0]
+    return asyncio.run(run()), sent
+
+
+def test_original_query_match_sends_no_variants():
+    original = query_variants("Song", "Artist")[0]
+
+    results, sent = search_match({original: [video("a")]})
+
+    assert sent == [original]
+    assert [r["videoId"] for r in results] == ["a"]
+
+
+def test_miss_fans_out_to_the_variants():
+    variants = query_variants("Song", "Artist")
+
+    results, sent = search_match(
+        {variants[0]: [video("long", 400)], variants[2]: [video("b")]}
+    )
+
+    assert sent == variants
+    assert [r["videoId"] for r in results] == ["b"]
+
+
+def test_slow_original_query_is_hedged():
+    variants = query_variants("Song", "Artist")
+
+    results, sent = search_match(
+        {variants[0]: [video("a")], variants[1]: [video("b")]},
+        delay=0.2,
+        hedge_delay=0.05,
+        enough=1,
+    )
+
+    assert sent == variants
+    assert [r["videoId"] for r in results] == ["b"]
+
+
+def test_no_match_anywhere():
+    with pytest.raises(NoResultsError):
+        search_match({})
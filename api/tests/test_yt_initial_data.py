@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from app.services.youtube import YoutubeScraper
+from app.services.yt_initial_data import extract_yt_initial_data
+
+# The same ytInitialData object, assigned the three ways YouTube pages embed it
+FIXTURES = [
+    "yt_results_var.html",
+    "yt_results_window.html",
+    "yt_results_embedded.html",
+]
+
+
+@pytest.fixture
+def scraper():
+    scraper = YoutubeScraper()
+    yield scraper
+    asyncio.run(scraper.aclose())
+
+
+@pytest.mark.parametrize("name", FIXTURES)
+def test_extracts_the_whole_object(fixture_text, name):
+    data = extract_yt_initial_data(fixture_text(name))
+
+    assert data is not None
+    assert data["estimatedResults"] == "1234567"
+    assert data["trackingParams"] == "CAAQvGkiEwj_fixture"
+
+
+def test_every_embedding_decodes_the_same(fixture_text):
+    decoded = [extract_yt_initial_data(fixture_text(name)) for name in FIXTURES]
+
+    assert decoded[0] is not None
+    assert all(data == decoded[0] for data in decoded[1:])
+
+
+def test_strings_with_json_and_script_syntax_survive(fixture_text):
+    data = extract_yt_initial_data(fixture_text("yt_results_window.html"))
+
+    titles = [
+        item["videoRenderer"]["title"]["runs"][0]["text"]
+        for item in data["contents"]["twoColumnSearchResultsRenderer"][
+            "primaryContents"
+        ]["sectionListRenderer"]["contents"][0]["itemSectionRenderer"]["contents"]
+        if "videoRenderer" in item
+    ]
+    assert 'Fixture Song; {live} "encore" };</b>' in titles
+    assert "Fixture Song – Beyoncé cover 🎤 </script>" in titles
+
+
+@pytest.mark.parametrize("name", FIXTURES)
+def test_search_results_parse_from_fixture(scraper, fixture_text, name):
+    results = scraper._parse_search_results(
+        scraper._extract_yt_initial_data(fixture_text(name))
+    )
+
+    # The live stream has no duration and is skipped
+    assert [r["videoId"] for r in results] == [
+        "fixAAAAAAA1",
+        "fixAAAAAAA2",
+        "fixAAAAAAA3",
+    ]
+    assert results[0]["verifiedArtist"] is True
+    assert results[0]["views"] == 2345678
+    assert results[1]["durationSec"] == 3723
+
+
+@pytest.mark.parametrize(
+    "html",
+    [
+        "",
+        "<html><body>no initial data here</body></html>",
+        '<script>var ytInitialData = {"contents": {"truncated": </script>',
+        "<script>var ytInitialData = [1, 2, 3];</script>",
+    ],
+)
+def test_missing_or_broken_data(html):
+    assert extract_yt_initial_data(html) is None